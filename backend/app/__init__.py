@@ -2,6 +2,7 @@ from flask import Flask
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
 import os
+import atexit
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -10,6 +11,9 @@ load_dotenv()
 # Initialize extensions
 db = SQLAlchemy()
 
+# Room for multipart boundaries and form fields around an uploaded clip
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
 def create_app():
     """Application factory pattern"""
     app = Flask(__name__)
@@ -18,15 +22,103 @@ def create_app():
     app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-secret-key')
     app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///query_assistant.db')
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # Query history lives in its own file so its writes never look like data changes
+    app.config['SQLALCHEMY_BINDS'] = {
+        'history': os.environ.get('QUERY_HISTORY_DATABASE_URL', 'sqlite:///query_history.db')
+    }
+    app.config['DATABASES'] = os.environ.get('DATABASES')
+    app.config['DATABASE_DIR'] = os.environ.get('DATABASE_DIR')
+    app.config['DATABASE_MAX_OPEN'] = int(os.environ.get('DATABASE_MAX_OPEN', 8))
+    app.config['DATABASE_POOL_SIZE'] = int(os.environ.get('DATABASE_POOL_SIZE', 4))
+    app.config['DATABASE_IDLE_TIMEOUT'] = float(os.environ.get('DATABASE_IDLE_TIMEOUT', 300))
+    app.config['RESPONSE_COMPRESSION_MIN_BYTES'] = int(os.environ.get('RESPONSE_COMPRESSION_MIN_BYTES', 1024))
+    app.config['READ_REPLICA'] = os.environ.get('READ_REPLICA', 'False').lower() == 'true'
+    app.config['READ_REPLICA_SYNC_INTERVAL'] = float(os.environ.get('READ_REPLICA_SYNC_INTERVAL', 5))
+    app.config['AUDIO_PREPROCESSING'] = os.environ.get('AUDIO_PREPROCESSING', 'True').lower() == 'true'
+    app.config['VOICE_MAX_UPLOAD_BYTES'] = int(os.environ.get('VOICE_MAX_UPLOAD_BYTES', 10 * 1024 * 1024))
+    # Werkzeug refuses larger bodies, declared or chunked, before a form is parsed
+    app.config['MAX_CONTENT_LENGTH'] = app.config['VOICE_MAX_UPLOAD_BYTES'] + MULTIPART_OVERHEAD_BYTES
+    app.config['TRANSCRIPT_CACHE_SIZE'] = int(os.environ.get('TRANSCRIPT_CACHE_SIZE', 256))
+    app.config['TRANSCRIPT_CACHE_DB'] = os.environ.get('TRANSCRIPT_CACHE_DB')
+    app.config['TRANSCRIPT_CACHE_TTL'] = float(os.environ.get('TRANSCRIPT_CACHE_TTL', 86400))
+    app.config['COALESCE_REQUESTS'] = os.environ.get('COALESCE_REQUESTS', 'True').lower() == 'true'
+    app.config['COALESCE_LOCK_DIR'] = os.environ.get('COALESCE_LOCK_DIR')
+    app.config['COALESCE_RESULT_TTL'] = float(os.environ.get('COALESCE_RESULT_TTL', 5.0))
+    app.config['COALESCE_MAX_FILES'] = int(os.environ.get('COALESCE_MAX_FILES', 1024))
+    app.config['QUERY_HISTORY'] = os.environ.get('QUERY_HISTORY', 'True').lower() == 'true'
+    app.config['QUERY_HISTORY_MAX_QUEUE'] = int(os.environ.get('QUERY_HISTORY_MAX_QUEUE', 10000))
+    app.config['QUERY_HISTORY_BATCH_SIZE'] = int(os.environ.get('QUERY_HISTORY_BATCH_SIZE', 500))
+    app.config['QUERY_HISTORY_FLUSH_INTERVAL'] = float(os.environ.get('QUERY_HISTORY_FLUSH_INTERVAL', 1.0))
+    app.config['QUERY_HISTORY_SAMPLE_RATE'] = float(os.environ.get('QUERY_HISTORY_SAMPLE_RATE', 0.1))
+    app.config['SEARCH_INDEX'] = os.environ.get('SEARCH_INDEX', 'True').lower() == 'true'
+    app.config['EXPORT_BATCH_SIZE'] = int(os.environ.get('EXPORT_BATCH_SIZE', 5000))
+    app.config['EXPORT_TYPE_PROBE'] = os.environ.get('EXPORT_TYPE_PROBE', 'False').lower() == 'true'
+    app.config['SUGGEST_REFRESH_INTERVAL'] = float(os.environ.get('SUGGEST_REFRESH_INTERVAL', 30.0))
+    app.config['MODEL_RELOAD_INTERVAL'] = float(os.environ.get('MODEL_RELOAD_INTERVAL', 2.0))
+    app.config['FEEDBACK_WEIGHT'] = float(os.environ.get('FEEDBACK_WEIGHT', 5.0))
+    app.config['FEEDBACK_TOKEN'] = os.environ.get('FEEDBACK_TOKEN')
+    app.config['ADMISSION_CONTROL'] = os.environ.get('ADMISSION_CONTROL', 'True').lower() == 'true'
+    app.config['ADMISSION_MAX_CONCURRENCY'] = int(os.environ.get('ADMISSION_MAX_CONCURRENCY', 32))
+    app.config['ADMISSION_BUDGETS'] = os.environ.get('ADMISSION_BUDGETS')
+    app.config['PROFILING_TOKEN'] = os.environ.get('PROFILING_TOKEN')
+    app.config['ASGI_MAX_CONCURRENCY'] = int(os.environ.get('ASGI_MAX_CONCURRENCY', 64))
+    app.config['ASGI_NLP_WORKERS'] = int(os.environ.get('ASGI_NLP_WORKERS', 4))
+    app.config['ASGI_DB_WORKERS'] = int(os.environ.get('ASGI_DB_WORKERS', 8))
+    app.config['ASGI_WSGI_WORKERS'] = int(os.environ.get('ASGI_WSGI_WORKERS', 16))
     
     # Initialize extensions with app
     db.init_app(app)
     CORS(app)
     
+    # Fast JSON encoding and negotiated compression for every response
+    from app.responses import FastJSONProvider, compress_response
+    app.json = FastJSONProvider(app)
+    app.after_request(compress_response)
+    
+    # Row and byte counters for streamed exports
+    from app.exporter import ExportStats
+    app.extensions['export_stats'] = ExportStats()
+    
+    # Share one execution among identical in-flight queries
+    if app.config['COALESCE_REQUESTS']:
+        from app.coalescing import SingleFlight
+        app.extensions['coalescer'] = SingleFlight(
+            app.config['COALESCE_LOCK_DIR'],
+            app.config['COALESCE_RESULT_TTL'],
+            app.config['COALESCE_MAX_FILES']
+        )
+    
+    # Cache transcripts of repeated voice clips
+    if app.config['TRANSCRIPT_CACHE_SIZE'] > 0:
+        from app.transcript_cache import TranscriptCache
+        app.extensions['transcript_cache'] = TranscriptCache(
+            app.config['TRANSCRIPT_CACHE_SIZE'],
+            app.config['TRANSCRIPT_CACHE_DB'],
+            app.config['TRANSCRIPT_CACHE_TTL']
+        )
+    
+    # Concurrency budgets and bounded wait queues per endpoint class
+    if app.config['ADMISSION_CONTROL']:
+        from app.admission import AdmissionController, DEFAULT_BUDGETS, parse_budgets
+        app.extensions['admission'] = AdmissionController(
+            parse_budgets(app.config['ADMISSION_BUDGETS'] or DEFAULT_BUDGETS),
+            app.config['ADMISSION_MAX_CONCURRENCY']
+        )
+    
+    # Named databases that requests can target, opened on demand
+    from app.registry import init_database_registry
+    registry = init_database_registry(app)
+    if registry is not None:
+        atexit.register(registry.close)
+    
     # Register blueprints
     from app.routes import bp as main_bp
     app.register_blueprint(main_bp)
     
+    # On-demand profiling, only installed when a token is configured
+    from app.profiling import init_profiling
+    init_profiling(app)
+    
     # Create tables and initialize data
     with app.app_context():
         # Import models first to ensure tables are created
@@ -35,5 +127,26 @@ def create_app():
         # Initialize sample data
         from app.database import init_sample_data
         init_sample_data()
+        # Full-text index over names and descriptions, kept in sync by triggers
+        if app.config['SEARCH_INDEX']:
+            from app.search import init_search_index
+            init_search_index(db.session)
+            db.session.commit()
+        # Log queries through a write-behind queue
+        if app.config['QUERY_HISTORY']:
+            from app.query_history import QueryHistoryLog
+            history = QueryHistoryLog(
+                db.engines['history'],
+                max_queue=app.config['QUERY_HISTORY_MAX_QUEUE'],
+                batch_size=app.config['QUERY_HISTORY_BATCH_SIZE'],
+                flush_interval=app.config['QUERY_HISTORY_FLUSH_INTERVAL'],
+                sample_rate=app.config['QUERY_HISTORY_SAMPLE_RATE']
+            ).start()
+            app.extensions['query_history'] = history
+            atexit.register(history.close)
+        # Serve read-only queries from an in-memory copy of the database
+        if app.config['READ_REPLICA']:
+            from app.replica import init_read_replica
+            init_read_replica(app)
     
     return app
@@ -0,0 +1,207 @@
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+
+# Endpoint classes as name=limit:queue:timeout, highest priority first.
+# Cheap NLP lookups come before SQL scans/exports, which come before voice;
+# model updates and history aggregation are heavy and come last.
+DEFAULT_BUDGETS = 'query=16:64:2,sql=4:16:5,voice=2:8:10,heavy=1:8:10'
+
+# Endpoint class of each path; every other API path is a cheap query
+PATH_CLASSES = {
+    '/api/sql': 'sql',
+    '/api/export': 'sql',
+    '/api/voice': 'voice',
+    '/api/feedback': 'heavy',
+    '/api/history': 'heavy'
+}
+
+# Paths that must keep answering under overload
+EXEMPT_PATHS = ('/api/health', '/api/admin/')
+
+def classify(method, path):
+    """Endpoint class of a request, or None if it bypasses admission control"""
+    if method == 'OPTIONS' or path.startswith(EXEMPT_PATHS):
+        return None
+    return PATH_CLASSES.get(path, 'query')
+
+def parse_budgets(spec):
+    """Parse 'name=limit:queue:timeout,...' into an ordered {name: (limit, queue_size, timeout)}"""
+    budgets = OrderedDict()
+    for item in spec.split(','):
+        if not item.strip():
+            continue
+        name, _, budget = item.partition('=')
+        try:
+            limit, queue_size, timeout = budget.split(':')
+            budgets[name.strip()] = (int(limit), int(queue_size), float(timeout))
+        except ValueError:
+            raise ValueError(f"Expected name=limit:queue:timeout in ADMISSION_BUDGETS, got '{item.strip()}'")
+    return budgets
+
+class Rejected(Exception):
+    """A request shed by admission control"""
+
+    def __init__(self, status, retry_after, reason):
+        super().__init__(reason)
+        self.status = status
+        self.retry_after = retry_after
+        self.reason = reason
+
+class Ticket:
+    """One request's claim on an endpoint class, granted now or after waiting in its queue"""
+
+    def __init__(self, endpoint_class):
+        self.endpoint_class = endpoint_class
+        self.granted = False
+        self.granted_at = None
+        self.event = threading.Event()
+
+class EndpointClass:
+
+    def __init__(self, name, priority, limit, queue_size, timeout):
+        self.name = name
+        self.priority = priority
+        self.limit = limit
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.active = 0
+        self.waiters = deque()
+        self.admitted = 0
+        self.shed_queue_full = 0
+        self.shed_timeout = 0
+        self.max_queue_depth = 0
+        self.service_time = None
+
+    def stats(self):
+        return {
+            'priority': self.priority,
+            'limit': self.limit,
+            'active': self.active,
+            'queue_depth': len(self.waiters),
+            'max_queue_depth': self.max_queue_depth,
+            'queue_size': self.queue_size,
+            'timeout': self.timeout,
+            'admitted': self.admitted,
+            'shed_queue_full': self.shed_queue_full,
+            'shed_timeout': self.shed_timeout,
+            'avg_service_ms': round(self.service_time * 1000, 3) if self.service_time is not None else None
+        }
+
+class AdmissionController:
+    """Per-endpoint-class concurrency budgets with bounded, prioritized wait queues
+
+    A request runs at once if its class and the process are under their
+    concurrency limits and no request of equal or higher priority is
+    waiting. Otherwise it queues until a slot frees up or its class's
+    deadline passes; a full queue rejects it immediately. Freed slots go to
+    the highest priority class with waiters first.
+    """
+
+    def __init__(self, budgets, max_concurrency=32):
+        self.max_concurrency = max_concurrency
+        self.active = 0
+        # Set when an outer ASGI layer admits requests before they reach Flask
+        self.handled_upstream = False
+
+        self._classes = OrderedDict(
+            (name, EndpointClass(name, priority, *budget))
+            for priority, (name, budget) in enumerate(budgets.items())
+        )
+        self._lock = threading.Lock()
+
+    @property
+    def queue_capacity(self):
+        """Most requests that can be queued at once across all classes"""
+        return sum(endpoint_class.queue_size for endpoint_class in self._classes.values())
+
+    def _fits(self, endpoint_class):
+        return endpoint_class.active < endpoint_class.limit and self.active < self.max_concurrency
+
+    def _grant(self, ticket):
+        ticket.endpoint_class.active += 1
+        ticket.endpoint_class.admitted += 1
+        self.active += 1
+        ticket.granted = True
+        ticket.granted_at = time.perf_counter()
+        ticket.event.set()
+
+    def _dispatch(self):
+        """Hand free slots to queued requests, highest priority class first"""
+        for endpoint_class in self._classes.values():
+            while endpoint_class.waiters and self._fits(endpoint_class):
+                self._grant(endpoint_class.waiters.popleft())
+
+    def _retry_after(self, endpoint_class):
+        """Seconds until a retry is likely to be admitted, from queue depth and service time"""
+        service_time = endpoint_class.service_time or endpoint_class.timeout / 4
+        return max(1, math.ceil(service_time * (len(endpoint_class.waiters) + 1) / endpoint_class.limit))
+
+    def request(self, name):
+        """Claim a slot for an endpoint class, queueing if none is free; raises Rejected when the queue is full"""
+        with self._lock:
+            # Classes left out of a custom budget share the lowest priority one
+            endpoint_class = self._classes.get(name) or next(reversed(self._classes.values()))
+            ticket = Ticket(endpoint_class)
+
+            # Queued requests of higher priority classes can only be waiting on
+            # the process-wide limit, which _fits already checks
+            if self._fits(endpoint_class) and not endpoint_class.waiters:
+                self._grant(ticket)
+                return ticket
+
+            if len(endpoint_class.waiters) >= endpoint_class.queue_size:
+                endpoint_class.shed_queue_full += 1
+                raise Rejected(429, self._retry_after(endpoint_class), f"Too many pending '{name}' requests")
+
+            endpoint_class.waiters.append(ticket)
+            endpoint_class.max_queue_depth = max(endpoint_class.max_queue_depth, len(endpoint_class.waiters))
+            return ticket
+
+    def wait(self, ticket):
+        """Block until a queued ticket is granted; raises Rejected once its deadline passes"""
+        endpoint_class = ticket.endpoint_class
+        if ticket.event.wait(endpoint_class.timeout):
+            return ticket
+
+        with self._lock:
+            if ticket.granted:
+                return ticket
+            if ticket in endpoint_class.waiters:
+                endpoint_class.waiters.remove(ticket)
+            endpoint_class.shed_timeout += 1
+            raise Rejected(503, self._retry_after(endpoint_class),
+                           f"Timed out waiting for a '{endpoint_class.name}' slot")
+
+    def acquire(self, name):
+        """Claim a slot, waiting in the queue if necessary"""
+        ticket = self.request(name)
+        return ticket if ticket.granted else self.wait(ticket)
+
+    def release(self, ticket):
+        """Free a granted slot, or withdraw a ticket that is still queued"""
+        with self._lock:
+            endpoint_class = ticket.endpoint_class
+            if not ticket.granted:
+                if ticket in endpoint_class.waiters:
+                    endpoint_class.waiters.remove(ticket)
+                return
+
+            endpoint_class.active -= 1
+            self.active -= 1
+            elapsed = time.perf_counter() - ticket.granted_at
+            # Moving average of service time, used for Retry-After
+            if endpoint_class.service_time is None:
+                endpoint_class.service_time = elapsed
+            else:
+                endpoint_class.service_time += 0.1 * (elapsed - endpoint_class.service_time)
+            self._dispatch()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'active': self.active,
+                'max_concurrency': self.max_concurrency,
+                'classes': {name: endpoint_class.stats() for name, endpoint_class in self._classes.items()}
+            }
@@ -0,0 +1,275 @@
+import asyncio
+import contextvars
+import cProfile
+import functools
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from asgiref.sync import sync_to_async
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+
+from app import create_app
+from app import routes
+from app.responses import encode_json, negotiate_encoding, compress
+from app.admission import Rejected, classify
+from app.profiling import summarize_profile, token_matches
+
+# Profiler of the current native request when it asked for one with X-Profile
+request_profiler = contextvars.ContextVar('request_profiler', default=None)
+
+class PooledWsgiToAsgi(WsgiToAsgi):
+    """WsgiToAsgi that runs the WSGI app on a bounded thread pool
+
+    asgiref runs wrapped WSGI apps thread-sensitively, i.e. one request at a
+    time on a single thread per process; a pool lets slow fallback requests
+    (voice, export, ...) run side by side.
+    """
+
+    def __init__(self, wsgi_application, executor):
+        super().__init__(wsgi_application)
+        self.executor = executor
+
+    async def __call__(self, scope, receive, send):
+        await PooledWsgiToAsgiInstance(self.wsgi_application, self.executor)(scope, receive, send)
+
+class PooledWsgiToAsgiInstance(WsgiToAsgiInstance):
+
+    def __init__(self, wsgi_application, executor):
+        super().__init__(wsgi_application)
+        self.executor = executor
+
+    async def run_wsgi_app(self, body):
+        def run():
+            # The undecorated body of asgiref's run_wsgi_app
+            WsgiToAsgiInstance.__dict__['run_wsgi_app'].func(self, body)
+
+        await sync_to_async(run, thread_sensitive=False, executor=self.executor)()
+
+class AsgiApp:
+    """ASGI front end for the API blueprint
+
+    The hot read endpoints (/api/query and /api/sql) are served by native
+    async handlers that offload NLP and SQLite work to bounded thread pools.
+    Every other request falls through to the Flask app on a bounded thread
+    pool. A semaphore caps the
+    number of requests being processed at once. With admission control
+    enabled, requests are admitted here, before the semaphore, so queued
+    requests hold no slots and every path shares one set of budgets.
+
+    X-Profile works on the native handlers too: the work they hand to the
+    NLP and DB pools runs under a per-request cProfile, summarized in the
+    response like Flask's profiling hooks do.
+    """
+
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        config = flask_app.config
+        self.wsgi_executor = ThreadPoolExecutor(config['ASGI_WSGI_WORKERS'], thread_name_prefix='wsgi')
+        self.wsgi_app = PooledWsgiToAsgi(flask_app, self.wsgi_executor)
+
+        self.max_concurrency = config['ASGI_MAX_CONCURRENCY']
+        self.nlp_executor = ThreadPoolExecutor(config['ASGI_NLP_WORKERS'], thread_name_prefix='nlp')
+        self.db_executor = ThreadPoolExecutor(config['ASGI_DB_WORKERS'], thread_name_prefix='db')
+        self._semaphore = None
+
+        self.admission = flask_app.extensions.get('admission')
+        self.admission_executor = None
+        if self.admission is not None:
+            self.admission.handled_upstream = True
+            # One thread per queue slot, so waiting never starves for threads
+            self.admission_executor = ThreadPoolExecutor(self.admission.queue_capacity, thread_name_prefix='admission')
+
+        self.handlers = {
+            ('POST', '/api/query'): self.process_query,
+            ('POST', '/api/sql'): self.execute_direct_sql
+        }
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+
+        if scope['type'] != 'http':
+            return
+
+        # Created lazily so it binds to the server's running loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        handler = self.handlers.get((scope['method'], scope['path']))
+
+        endpoint_class = classify(scope['method'], scope['path']) if self.admission is not None else None
+        ticket = None
+        if endpoint_class is not None:
+            try:
+                ticket = await self.admit(endpoint_class)
+            except Rejected as e:
+                await self.send_json(scope, send, e.status, {'success': False, 'error': e.reason},
+                                     [(b'retry-after', str(e.retry_after).encode())])
+                return
+
+        try:
+            async with self._semaphore:
+                if handler is None:
+                    await self.wsgi_app(scope, receive, send)
+                    return
+
+                profiler = self.start_profile(scope)
+                try:
+                    status, payload = await handler(await self.read_json(receive))
+                except Exception as e:
+                    logging.error(f"Error handling {scope['path']}: {str(e)}")
+                    status, payload = 500, {
+                        'success': False,
+                        'error': f'Internal server error: {str(e)}'
+                    }
+
+                if profiler is not None:
+                    payload['profile'] = summarize_profile(profiler)
+                await self.send_json(scope, send, status, payload)
+        finally:
+            if ticket is not None:
+                self.admission.release(ticket)
+
+    def start_profile(self, scope):
+        """Set up a profiler for this request if its X-Profile header carries the token"""
+        supplied = dict(scope.get('headers', [])).get(b'x-profile', b'').decode('latin-1')
+        profiler = cProfile.Profile() if token_matches(self.flask_app.config['PROFILING_TOKEN'], supplied) else None
+        # Set either way, so a server reusing a task's context never inherits another request's profiler
+        request_profiler.set(profiler)
+        return profiler
+
+    def _profiled(self, func):
+        """func, run under the request's profiler if it has one; pool steps of a request run one at a time"""
+        profiler = request_profiler.get()
+        if profiler is None:
+            return func
+        return functools.partial(profiler.runcall, func)
+
+    async def admit(self, endpoint_class):
+        """Claim an admission slot, waiting on the admission pool if the request is queued"""
+        ticket = self.admission.request(endpoint_class)
+        if ticket.granted:
+            return ticket
+
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self.admission_executor, self.admission.wait, ticket)
+        except asyncio.CancelledError:
+            self.admission.release(ticket)
+            raise
+
+    async def lifespan(self, receive, send):
+        """Shut the worker pools down with the server"""
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.nlp_executor.shutdown(wait=False)
+                self.db_executor.shutdown(wait=False)
+                self.wsgi_executor.shutdown(wait=False)
+                if self.admission_executor is not None:
+                    self.admission_executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def read_json(self, receive):
+        """Read the request body and decode it as JSON, or None if it isn't JSON"""
+        body = b''
+        more_body = True
+
+        while more_body:
+            message = await receive()
+            body += message.get('body', b'')
+            more_body = message.get('more_body', False)
+
+        try:
+            return json.loads(body) if body else None
+        except ValueError:
+            return None
+
+    async def send_json(self, scope, send, status, payload, extra_headers=()):
+        """Send a JSON response, compressed when the client accepts it"""
+        body = encode_json(payload)
+        headers = [
+            (b'content-type', b'application/json'),
+            (b'vary', b'Accept-Encoding'),
+            (b'access-control-allow-origin', b'*')
+        ]
+        headers.extend(extra_headers)
+
+        min_bytes = self.flask_app.config['RESPONSE_COMPRESSION_MIN_BYTES']
+        if 0 < min_bytes <= len(body):
+            request_headers = dict(scope.get('headers', []))
+            encoding = negotiate_encoding(request_headers.get(b'accept-encoding', b'').decode('latin-1'))
+            if encoding is not None:
+                body = compress(body, encoding)
+                headers.append((b'content-encoding', encoding.encode()))
+
+        headers.append((b'content-length', str(len(body)).encode()))
+
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': headers
+        })
+        await send({'type': 'http.response.body', 'body': body})
+
+    async def run_nlp(self, func, *args):
+        """Run CPU-bound NLP work on the NLP pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.nlp_executor, self._profiled(func), *args)
+
+    async def run_db(self, func, *args):
+        """Run blocking database work on the DB pool inside an app context"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.db_executor, self._profiled(self._in_app_context), func, *args)
+
+    def _in_app_context(self, func, *args):
+        with self.flask_app.app_context():
+            return func(*args)
+
+    async def process_query(self, data):
+        """Async counterpart of routes.process_query"""
+        started = time.perf_counter()
+        # Between-request model swap, as routes.refresh_intent_model does for Flask; it may load a model file
+        await self.run_nlp(routes.nlp_processor.maybe_reload)
+        query_text, error = routes.validate_query_request(data)
+        with self.flask_app.app_context():
+            database, database_error = routes.resolve_database(data.get('database') if data else None)
+        try:
+            if error or database_error:
+                return 400, {'success': False, 'error': error or database_error}
+
+            sql_query, intent, confidence, model_version = await self.run_nlp(routes.translate_query, query_text, database)
+            # Identical SQL from concurrent requests shares one execution
+            query_result = await self.run_db(routes.run_sql, sql_query, database)
+        finally:
+            # No Flask request here to release the lease on teardown
+            self._in_app_context(routes.release_database, database)
+
+        with self.flask_app.app_context():
+            routes.record_query('text', query_text, sql_query, intent, confidence, query_result, started)
+
+        return 200, routes.query_payload(query_text, sql_query, intent, model_version, query_result)
+
+    async def execute_direct_sql(self, data):
+        """Async counterpart of routes.execute_direct_sql"""
+        sql_query, error = routes.validate_sql_request(data)
+        with self.flask_app.app_context():
+            database, database_error = routes.resolve_database(data.get('database') if data else None)
+        try:
+            if error or database_error:
+                return 400, {'success': False, 'error': error or database_error}
+
+            query_result = await self.run_db(routes.run_sql, sql_query, database)
+        finally:
+            self._in_app_context(routes.release_database, database)
+
+        return 200, routes.sql_payload(sql_query, query_result)
+
+def create_asgi_app():
+    """Build the Flask app and wrap it for ASGI servers"""
+    return AsgiApp(create_app())
@@ -0,0 +1,202 @@
+import io
+import wave
+import numpy as np
+import speech_recognition as sr
+
+class AudioProcessor:
+    """Normalize uploaded recordings before speech recognition"""
+
+    def __init__(self, target_rate=16000, frame_ms=30, silence_db=-50.0,
+                 dynamic_range_db=35.0, padding_ms=200):
+        self.target_rate = target_rate
+        self.frame_ms = frame_ms
+        self.silence_db = silence_db
+        self.dynamic_range_db = dynamic_range_db
+        self.padding_ms = padding_ms
+
+    def read_upload(self, stream, max_bytes, chunk_size=64 * 1024):
+        """Read an upload stream in chunks, stopping once it exceeds max_bytes"""
+        buffer = io.BytesIO()
+        total = 0
+
+        while True:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                break
+
+            total += len(chunk)
+            if total > max_bytes:
+                return {
+                    'success': False,
+                    'data': None,
+                    'error': f'Audio file exceeds the {max_bytes} byte limit'
+                }
+            buffer.write(chunk)
+
+        return {
+            'success': True,
+            'data': buffer.getvalue(),
+            'error': None
+        }
+
+    def decode(self, audio_data):
+        """Decode an audio container into float samples, sample rate and channel count"""
+        try:
+            with wave.open(io.BytesIO(audio_data), 'rb') as wav:
+                channels = wav.getnchannels()
+                sample_width = wav.getsampwidth()
+                sample_rate = wav.getframerate()
+                frames = wav.readframes(wav.getnframes())
+        except (wave.Error, EOFError):
+            # Not a plain PCM WAV; let speech_recognition handle AIFF/FLAC
+            with sr.AudioFile(io.BytesIO(audio_data)) as source:
+                audio = sr.Recognizer().record(source)
+            channels = 1
+            sample_width = audio.sample_width
+            sample_rate = audio.sample_rate
+            frames = audio.frame_data
+
+        samples = self._pcm_to_float(frames, sample_width)
+        samples = samples[:len(samples) - len(samples) % channels].reshape(-1, channels)
+        return samples, sample_rate, channels
+
+    def _pcm_to_float(self, frames, sample_width):
+        """Convert little-endian PCM bytes to float32 samples in [-1, 1]"""
+        if sample_width == 1:
+            # 8-bit WAV is unsigned
+            return (np.frombuffer(frames, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+        if sample_width == 2:
+            return np.frombuffer(frames, dtype='<i2').astype(np.float32) / 32768.0
+        if sample_width == 3:
+            raw = np.frombuffer(frames[:len(frames) - len(frames) % 3], dtype=np.uint8).reshape(-1, 3)
+            padded = np.zeros((len(raw), 4), dtype=np.uint8)
+            padded[:, 1:] = raw
+            return padded.view('<i4').reshape(-1).astype(np.float32) / 2147483648.0
+        if sample_width == 4:
+            return np.frombuffer(frames, dtype='<i4').astype(np.float32) / 2147483648.0
+        raise ValueError(f'Unsupported sample width: {sample_width}')
+
+    def downmix(self, samples):
+        """Average all channels into a mono signal"""
+        return samples.mean(axis=1) if samples.shape[1] > 1 else samples[:, 0]
+
+    def resample(self, samples, source_rate):
+        """Resample mono samples to the target rate"""
+        if source_rate == self.target_rate or len(samples) == 0:
+            return samples
+
+        if source_rate > self.target_rate:
+            # Windowed-sinc low-pass at the new Nyquist frequency to avoid aliasing
+            cutoff = 0.5 * self.target_rate / source_rate
+            taps = np.arange(-32, 33)
+            kernel = 2 * cutoff * np.sinc(2 * cutoff * taps) * np.hamming(len(taps))
+            samples = np.convolve(samples, kernel / kernel.sum(), mode='same')
+
+        duration = len(samples) / source_rate
+        target_length = int(round(duration * self.target_rate))
+        source_times = np.arange(len(samples)) / source_rate
+        target_times = np.arange(target_length) / self.target_rate
+        return np.interp(target_times, source_times, samples).astype(np.float32)
+
+    def trim_silence(self, samples):
+        """Drop leading and trailing silence using frame energy"""
+        frame_length = int(self.target_rate * self.frame_ms / 1000)
+        frame_count = len(samples) // frame_length
+        if frame_count == 0:
+            return samples
+
+        frames = samples[:frame_count * frame_length].reshape(frame_count, frame_length)
+        rms = np.sqrt(np.mean(frames ** 2, axis=1))
+        energy_db = 20 * np.log10(np.maximum(rms, 1e-10))
+
+        threshold = max(self.silence_db, energy_db.max() - self.dynamic_range_db)
+        voiced = np.flatnonzero(energy_db > threshold)
+        if len(voiced) == 0:
+            return samples[:0]
+
+        padding = int(self.target_rate * self.padding_ms / 1000)
+        start = max(voiced[0] * frame_length - padding, 0)
+        end = min((voiced[-1] + 1) * frame_length + padding, len(samples))
+        return samples[start:end]
+
+    def normalize(self, audio_data):
+        """Decode, downmix and resample to 16 kHz mono without trimming"""
+        try:
+            samples, sample_rate, channels = self.decode(audio_data)
+        except Exception as e:
+            return {
+                'success': False,
+                'samples': None,
+                'pcm': None,
+                'sample_rate': None,
+                'stats': None,
+                'error': f'Could not decode audio: {str(e)}'
+            }
+
+        mono = self.resample(self.downmix(samples), sample_rate)
+
+        stats = {
+            'original_duration': round(len(samples) / sample_rate if sample_rate else 0.0, 3),
+            'processed_duration': None,
+            'original_sample_rate': sample_rate,
+            'original_channels': channels,
+            'bytes_in': len(audio_data),
+            'bytes_out': None
+        }
+
+        return {
+            'success': True,
+            'samples': mono,
+            'pcm': self._float_to_pcm(mono),
+            'sample_rate': self.target_rate,
+            'stats': stats,
+            'error': None
+        }
+
+    def _float_to_pcm(self, samples):
+        """Convert float samples to 16-bit little-endian PCM bytes"""
+        return (np.clip(samples, -1.0, 1.0) * 32767).astype('<i2').tobytes()
+
+    def process(self, audio_data, normalized=None):
+        """Decode, downmix, resample to 16 kHz mono and trim silence
+
+        Pass the result of normalize() as normalized to skip decoding again.
+        """
+        if normalized is None:
+            normalized = self.normalize(audio_data)
+
+        if not normalized['success']:
+            return {
+                'success': False,
+                'pcm': None,
+                'sample_rate': None,
+                'sample_width': None,
+                'stats': None,
+                'error': normalized['error']
+            }
+
+        trimmed = self.trim_silence(normalized['samples'])
+        pcm = self._float_to_pcm(trimmed)
+
+        stats = dict(normalized['stats'],
+                     processed_duration=round(len(trimmed) / self.target_rate, 3),
+                     bytes_out=len(pcm))
+
+        if len(trimmed) == 0:
+            return {
+                'success': False,
+                'pcm': None,
+                'sample_rate': self.target_rate,
+                'sample_width': 2,
+                'stats': stats,
+                'error': 'No speech detected in the audio'
+            }
+
+        return {
+            'success': True,
+            'pcm': pcm,
+            'sample_rate': self.target_rate,
+            'sample_width': 2,
+            'stats': stats,
+            'error': None
+        }
@@ -0,0 +1,216 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+class _Call:
+    """An in-flight computation and the threads waiting on it"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """Share one execution among concurrent callers with the same key
+
+    Within a process, the first caller for a key runs the computation and
+    later callers block until it finishes and receive the same result. With
+    a lock directory, workers on the same host also serialize on a per-key
+    lock file. Workers queued behind it hold a shared lock on the key's
+    .wait file; only when one is waiting does the worker that ran the
+    computation write its result for them, and the last of them to read it
+    deletes it. Files older than result_ttl are swept, as are the oldest
+    files once the directory holds more than max_files.
+    """
+
+    def __init__(self, lock_dir=None, result_ttl=5.0, max_files=1024):
+        self.lock_dir = lock_dir
+        self.result_ttl = result_ttl
+        self.max_files = max_files
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._last_sweep = 0.0
+
+        self.executions = 0
+        self.coalesced = 0
+        self.shared_from_peers = 0
+        self.swept = 0
+
+        if lock_dir and fcntl is None:
+            logging.warning("Cross-worker request coalescing needs fcntl; coalescing within this process only")
+            self.lock_dir = None
+        elif lock_dir:
+            os.makedirs(lock_dir, exist_ok=True)
+
+    def do(self, key, func):
+        """Run func() once for all concurrent callers using the same key"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._execute(key, func)
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+        return call.result
+
+    def _execute(self, key, func):
+        if not self.lock_dir:
+            with self._lock:
+                self.executions += 1
+            return func()
+
+        self._maybe_sweep()
+
+        digest = hashlib.sha1(key.encode()).hexdigest()
+        path = os.path.join(self.lock_dir, digest)
+        started = time.time_ns()
+
+        with open(path + '.wait', 'a') as wait_file, open(path + '.lock', 'a') as lock_file:
+            # Announce this caller as a waiter until it holds the key's lock
+            fcntl.flock(wait_file, fcntl.LOCK_SH)
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            fcntl.flock(wait_file, fcntl.LOCK_UN)
+            try:
+                os.utime(path + '.lock')
+
+                # A peer finished this key while we waited for the lock
+                shared = self._read_shared(path + '.json', started)
+                if shared is not None:
+                    with self._lock:
+                        self.shared_from_peers += 1
+                    if not self._has_waiters(path):
+                        self._remove(path + '.json')
+                    return shared
+
+                with self._lock:
+                    self.executions += 1
+                result = func()
+                if self._has_waiters(path):
+                    self._write_shared(path + '.json', result)
+                return result
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _has_waiters(self, path):
+        """Whether another worker is queued on a key; call while holding its lock"""
+        try:
+            with open(path + '.wait', 'a') as wait_file:
+                fcntl.flock(wait_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                fcntl.flock(wait_file, fcntl.LOCK_UN)
+                return False
+        except BlockingIOError:
+            return True
+        except OSError:
+            return False
+
+    def _read_shared(self, path, since_ns):
+        try:
+            if os.stat(path).st_mtime_ns < since_ns:
+                return None
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_shared(self, path, result):
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.lock_dir, suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump(result, f, default=str)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            logging.warning(f"Could not share coalesced result: {str(e)}")
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
+
+    def _remove_idle(self, path):
+        """Remove a file unless it is a lock or wait file some worker holds"""
+        if not path.endswith(('.lock', '.wait')):
+            return self._remove(path)
+
+        try:
+            with open(path, 'a') as f:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                # A worker that opened the old file before this unlink loses coalescing, not correctness
+                return self._remove(path)
+        except OSError:
+            return False
+
+    def _maybe_sweep(self):
+        """Sweep the lock directory at most once per result_ttl"""
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_sweep < self.result_ttl:
+                return
+            self._last_sweep = now
+        self.sweep()
+
+    def sweep(self):
+        """Remove files older than result_ttl, then the oldest idle ones past max_files"""
+        now = time.time()
+        try:
+            entries = sorted((entry.stat().st_mtime, entry.path) for entry in os.scandir(self.lock_dir))
+        except OSError:
+            return 0
+
+        excess = len(entries) - self.max_files
+        removed = 0
+        for mtime, path in entries:
+            if excess <= 0 and now - mtime < self.result_ttl:
+                # Oldest first: everything after this is fresh too
+                break
+            if self._remove_idle(path):
+                removed += 1
+                excess -= 1
+
+        with self._lock:
+            self.swept += removed
+        return removed
+
+    def stats(self):
+        """Executions run and executions saved by coalescing"""
+        with self._lock:
+            return {
+                'executions': self.executions,
+                'coalesced': self.coalesced,
+                'shared_from_peers': self.shared_from_peers,
+                'saved': self.coalesced + self.shared_from_peers,
+                'swept': self.swept,
+                'in_flight': len(self._calls)
+            }
+
+def normalize_query(text):
+    """Canonical form of a query for coalescing: lowercase, single-spaced"""
+    return ' '.join(text.lower().split())
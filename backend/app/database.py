@@ -1,6 +1,8 @@
+from flask import current_app
 from app import db
 from app.models import Employee, Department, Project
 from datetime import date, datetime
+import re
 import sqlite3
 import pandas as pd
 
@@ -114,27 +116,34 @@ def init_sample_data():
     
     db.session.commit()
 
-def execute_sql_query(query):
-    """Execute SQL query and return results"""
+# Application tables that are not part of the queryable schema, along with
+# their shadow tables (search_index_data, ...)
+INTERNAL_TABLES = ('query_history', 'search_index')
+
+def execute_sql_query(query, database=None):
+    """Execute SQL query and return results, on a registry database if one is given"""
     try:
-        # Use raw SQL execution for more flexibility
-        result = db.session.execute(query)
+        replica = current_app.extensions.get('read_replica')
         
-        # Convert to list of dictionaries
-        columns = result.keys() if hasattr(result, 'keys') else []
-        rows = result.fetchall()
+        if database is not None:
+            columns, rows = database.execute(query)
+        elif replica is not None:
+            # Read from the in-memory replica instead of the on-disk file
+            columns, rows = replica.execute(query)
+        else:
+            # Use raw SQL execution for more flexibility
+            result = db.session.execute(query)
+            columns = result.keys() if hasattr(result, 'keys') else []
+            rows = result.fetchall()
         
-        data = []
-        for row in rows:
-            row_dict = {}
-            for i, column in enumerate(columns):
-                row_dict[column] = row[i] if i < len(row) else None
-            data.append(row_dict)
+        # Convert to list of dictionaries
+        columns = list(columns)
+        data = [dict(zip(columns, row)) for row in rows]
         
         return {
             'success': True,
             'data': data,
-            'columns': list(columns),
+            'columns': columns,
             'row_count': len(data),
             'error': None
         }
@@ -148,34 +157,141 @@ def execute_sql_query(query):
             'error': str(e)
         }
 
-def get_database_schema():
-    """Get database schema information"""
-    try:
-        schema_info = {
-            'tables': []
-        }
+def iter_query_batches(query, batch_size=5000, database=None):
+    """Execute a read-only query and return (columns, batches) without materializing the result
+    
+    The query runs immediately so errors surface before any output is sent;
+    the batches generator then fetches batch_size rows at a time.
+    """
+    if database is not None:
+        return database.iter_batches(query, batch_size)
+    
+    replica = current_app.extensions.get('read_replica')
+    
+    if replica is not None:
+        return replica.iter_batches(query, batch_size)
+    
+    result = db.session.execute(query)
+    columns = list(result.keys())
+    
+    def batches():
+        try:
+            while True:
+                rows = result.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            result.close()
+    
+    return columns, batches()
+
+def probe_column_types(query, columns, database=None):
+    """Storage classes each result column holds, from one typeof() scan over the query, or None on error
+    
+    The scan runs the whole query a second time; see declared_column_types for the schema-only hints.
+    """
+    if not columns:
+        return []
+    
+    aliases = ', '.join(f'c{index}' for index in range(len(columns)))
+    classes = ', '.join(f"group_concat(DISTINCT typeof(c{index}))" for index in range(len(columns)))
+    # The CTE column list renames result columns by position, so duplicate names are fine
+    probe = f"WITH probed({aliases}) AS ({query.strip().rstrip(';')}) SELECT {classes} FROM probed"
+    
+    result = execute_sql_query(probe, database)
+    if not result['success'] or not result['data']:
+        return None
+    
+    row = result['data'][0]
+    return [set(row[column].split(',')) if row[column] else set() for column in result['columns']]
+
+def declared_storage_class(declared_type):
+    """Storage class a declared column type's affinity keeps values in, or None if it may hold several"""
+    declared_type = (declared_type or '').upper()
+    
+    # SQLite's affinity rules, in its order
+    if 'INT' in declared_type:
+        return 'integer'
+    if any(name in declared_type for name in ('CHAR', 'CLOB', 'TEXT')):
+        return 'text'
+    if 'BLOB' in declared_type or not declared_type:
+        return None
+    if any(name in declared_type for name in ('REAL', 'FLOA', 'DOUB')):
+        return 'real'
+    # NUMERIC affinity (DATE, DECIMAL, ...) keeps whatever was stored
+    return None
+
+def declared_column_types(query, columns, database=None):
+    """Storage classes declared for each result column by the tables a query names, matched by column name
+    
+    Reads only the schema, never the query's rows. A name declared
+    differently in two tables gets both classes.
+    """
+    schema_result = get_database_schema(database)
+    declared = {}
+    
+    for table in schema_result['schema'].get('tables', []):
+        if not re.search(r'\b' + re.escape(table['name']) + r'\b', query, re.IGNORECASE):
+            continue
+        for column in table['columns']:
+            storage = declared_storage_class(column['type'])
+            if storage is not None:
+                declared.setdefault(column['name'], set()).add(storage)
+    
+    return [declared.get(name, set()) for name in columns]
+
+def describe_tables(execute):
+    """Describe every user table, given a function that runs SQL and returns rows"""
+    schema_info = {
+        'tables': []
+    }
+    
+    tables = [row[0] for row in execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+    )]
+    
+    for table_name in tables:
+        if table_name in INTERNAL_TABLES or table_name.startswith(tuple(f'{name}_' for name in INTERNAL_TABLES)):
+            continue
         
-        # Get table information
-        tables = ['employees', 'departments', 'projects']
+        # Get column information
+        columns = []
         
-        for table_name in tables:
-            # Get column information
-            result = db.session.execute(f"PRAGMA table_info({table_name})")
-            columns = []
-            
-            for row in result.fetchall():
-                columns.append({
-                    'name': row[1],
-                    'type': row[2],
-                    'nullable': not row[3],
-                    'primary_key': bool(row[5])
-                })
-            
-            schema_info['tables'].append({
-                'name': table_name,
-                'columns': columns
+        for row in execute(f'PRAGMA table_info("{table_name}")'):
+            columns.append({
+                'name': row[1],
+                'type': row[2],
+                'nullable': not row[3],
+                'primary_key': bool(row[5])
             })
         
+        schema_info['tables'].append({
+            'name': table_name,
+            'columns': columns
+        })
+    
+    return schema_info
+
+def read_vocabulary(execute, tables):
+    """Entity values the NLP processor matches in questions (department names)"""
+    vocabulary = {
+        'departments': []
+    }
+    
+    if 'departments' in tables:
+        vocabulary['departments'] = [row[0] for row in execute("SELECT name FROM departments ORDER BY name") if row[0]]
+    
+    return vocabulary
+
+def get_database_schema(database=None):
+    """Get database schema information, from a registry database's cached catalog if one is given"""
+    try:
+        if database is not None:
+            schema_info = database.catalog()['schema']
+        else:
+            schema_info = describe_tables(lambda sql: db.session.execute(sql).fetchall())
+        
         return {
             'success': True,
             'schema': schema_info,
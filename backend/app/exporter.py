@@ -0,0 +1,205 @@
+import csv
+import io
+import logging
+import threading
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+    'arrow': ('application/vnd.apache.arrow.stream', 'arrows')
+}
+
+def available_formats():
+    """Export formats usable in this process"""
+    if pa is None:
+        return ['csv']
+    return list(EXPORT_FORMATS)
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands its contents back in chunks
+
+    Keeps an absolute position so writers that record offsets (Parquet)
+    stay correct while the buffered bytes are drained after every batch.
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+class ExportStats:
+    """Counters for completed exports"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.exports = 0
+        self.rows = 0
+        self.bytes = 0
+
+    def add(self, rows, size):
+        with self._lock:
+            self.exports += 1
+            self.rows += rows
+            self.bytes += size
+
+    def stats(self):
+        with self._lock:
+            return {'exports': self.exports, 'rows': self.rows, 'bytes': self.bytes}
+
+def _csv_chunks(columns, batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    writer.writerow(columns)
+    for rows in batches:
+        writer.writerows(rows)
+        yield len(rows), buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+
+    # Header-only output for empty results
+    if buffer.tell():
+        yield 0, buffer.getvalue().encode('utf-8')
+
+def storage_class(value):
+    """SQLite storage class of a Python value, as typeof() would report it"""
+    if value is None:
+        return 'null'
+    if isinstance(value, (bool, int)):
+        return 'integer'
+    if isinstance(value, float):
+        return 'real'
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return 'blob'
+    return 'text'
+
+def arrow_type(storage_classes):
+    """Arrow type wide enough for every storage class a column holds"""
+    classes = set(storage_classes) - {'null'}
+    if not classes:
+        return pa.string()
+    if classes == {'integer'}:
+        return pa.int64()
+    if classes <= {'integer', 'real'}:
+        return pa.float64()
+    if classes == {'blob'}:
+        return pa.binary()
+    return pa.string()
+
+def _coerce(value, arrow_type):
+    """Convert a value to a column's type without losing information"""
+    if value is None:
+        return None
+    if pa.types.is_string(arrow_type):
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            return bytes(value).hex()
+        return value if isinstance(value, str) else str(value)
+    if pa.types.is_floating(arrow_type):
+        return float(value)
+    if pa.types.is_binary(arrow_type):
+        return value.encode('utf-8') if isinstance(value, str) else bytes(value)
+    if isinstance(value, float) and not value.is_integer():
+        # Arrow would silently truncate it to an integer
+        raise ValueError(f'{value!r} does not fit an integer column')
+    return value
+
+def _schema(columns, column_types):
+    return pa.schema([(name, arrow_type(classes)) for name, classes in zip(columns, column_types)])
+
+def _record_batch(rows, schema):
+    """Convert row tuples into a columnar RecordBatch of the given schema"""
+    values = list(zip(*rows)) if rows else [[] for _ in schema]
+    arrays = [
+        pa.array([_coerce(value, field.type) for value in column_values], type=field.type)
+        for column_values, field in zip(values, schema)
+    ]
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+def _open_writer(sink, schema, fmt):
+    output = pa.PythonFile(sink, mode='w')
+    if fmt == 'parquet':
+        return pq.ParquetWriter(output, schema)
+    return pa.ipc.new_stream(output, schema)
+
+def _arrow_chunks(columns, batches, fmt, column_types=None, declared_types=None):
+    sink = _ChunkSink()
+    writer = None
+    schema = _schema(columns, column_types) if column_types is not None else None
+    declared_types = declared_types or [set() for _ in columns]
+
+    try:
+        for rows in batches:
+            if schema is None:
+                # No probed types: the first batch's storage classes plus the declared ones,
+                # so a column whose first values disagree with its declaration becomes a string
+                schema = _schema(columns, [
+                    {storage_class(value) for value in values} | declared
+                    for values, declared in zip(zip(*rows), declared_types)
+                ])
+            try:
+                batch = _record_batch(rows, schema)
+            except (ValueError, TypeError) as e:
+                raise ValueError(f'A later batch does not fit the export column types; retry with probe_types: {e}') from e
+            if writer is None:
+                writer = _open_writer(sink, schema, fmt)
+
+            # One Parquet row group / Arrow record batch per fetched batch
+            writer.write_batch(batch)
+            yield len(rows), sink.drain()
+
+        if writer is None:
+            writer = _open_writer(sink, schema or _schema(columns, declared_types), fmt)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    # Parquet footer / Arrow end-of-stream marker
+    yield 0, sink.drain()
+
+def stream_export(columns, batches, fmt, stats=None, column_types=None, declared_types=None):
+    """Yield encoded chunks of an export, one per fetched batch
+
+    column_types lists every SQLite storage class each column holds (see
+    database.probe_column_types); Parquet and Arrow columns are typed to fit
+    all of them. Without it the types come from the first batch merged with
+    declared_types (see database.declared_column_types), and a later value
+    that does not fit fails the export.
+    """
+    if fmt == 'csv':
+        chunks = _csv_chunks(columns, batches)
+    else:
+        chunks = _arrow_chunks(columns, batches, fmt, column_types, declared_types)
+    rows = 0
+    size = 0
+
+    for row_count, chunk in chunks:
+        rows += row_count
+        size += len(chunk)
+        if chunk:
+            yield chunk
+
+    logging.info(f"Export finished: format={fmt} rows={rows} bytes={size}")
+    if stats is not None:
+        stats.add(rows, size)
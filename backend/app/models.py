@@ -14,7 +14,7 @@ class Employee(db.Model):
     hire_date = db.Column(db.Date, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
-    department = db.relationship('Department', backref=db.backref('employees', lazy=True))
+    department = db.relationship('Department', foreign_keys=[department_id], backref=db.backref('employees', lazy=True))
     
     def to_dict(self):
         return {
@@ -72,3 +72,34 @@ class Project(db.Model):
             'status': self.status,
             'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S')
         }
+
+class QueryHistory(db.Model):
+    """Record of a processed query for capacity planning and retraining"""
+    __tablename__ = 'query_history'
+    __bind_key__ = 'history'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    source = db.Column(db.String(10), nullable=False, default='text')
+    query_text = db.Column(db.Text, nullable=False)
+    normalized_query = db.Column(db.Text, nullable=False, index=True)
+    sql_query = db.Column(db.Text)
+    intent = db.Column(db.String(50), index=True)
+    confidence = db.Column(db.Float)
+    row_count = db.Column(db.Integer)
+    latency_ms = db.Column(db.Float)
+    success = db.Column(db.Boolean, default=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'source': self.source,
+            'query_text': self.query_text,
+            'sql_query': self.sql_query,
+            'intent': self.intent,
+            'confidence': self.confidence,
+            'row_count': self.row_count,
+            'latency_ms': self.latency_ms,
+            'success': self.success,
+            'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S')
+        }
@@ -8,6 +8,43 @@ from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score
 import joblib
 import os
+import copy
+import json
+import time
+import threading
+
+from app.search import build_search_sql
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Words that introduce a full-text search term; name cues search names only
+SEARCH_CUE = re.compile(r'\b(named|called|about|related to|mentioning|matching|containing|regarding|search for|search|look up)\s+')
+NAME_CUES = ('named', 'called')
+# A cue right after a record kind or before one ("projects about", "search for employees") or a quoted phrase
+EXPLICIT_BEFORE_CUE = re.compile(r'\b(projects?|departments?|employees?|people|person)\s+$')
+EXPLICIT_AFTER_CUE = re.compile(r'(["\'\u201c]|(projects?|departments?|employees?|people|person)\b)')
+
+# Example searches; cues route these, so they are not a classifier class
+SEARCH_EXAMPLES = [
+    'find projects about analytics',
+    'search projects for mobile',
+    'projects related to customer support',
+    'employees named smith',
+    'find employee called john',
+    'search for data',
+    'departments about finance',
+    'look up projects mentioning website'
+]
+
+# Words dropped from search terms
+SEARCH_STOP_WORDS = {
+    'a', 'an', 'the', 'and', 'or', 'of', 'in', 'on', 'for', 'to', 'with', 'all', 'any', 'that', 'who', 'which',
+    'find', 'search', 'show', 'list', 'get', 'look', 'up', 'me',
+    'project', 'projects', 'employee', 'employees', 'department', 'departments', 'people', 'person'
+}
 
 # Download required NLTK data
 try:
@@ -22,8 +59,15 @@ from nltk.tokenize import word_tokenize
 from nltk.stem import WordNetLemmatizer
 
 class NLPProcessor:
-    def __init__(self):
-        self.pipeline = None
+    def __init__(self, model_path='models/intent_classifier.pkl', reload_interval=2.0):
+        # (version, pipeline), replaced as one reference so readers never pair a version with another pipeline
+        self.model = None
+        self.model_path = model_path
+        self.feedback_path = os.path.join(os.path.dirname(model_path), 'intent_feedback.jsonl')
+        self.reload_interval = reload_interval
+        self._model_mtime = None
+        self._last_reload_check = 0.0
+        self._update_lock = threading.Lock()
         self.intent_patterns = {
             'select_all': [
                 'show all employees',
@@ -95,14 +139,24 @@ class NLPProcessor:
             # Fallback if NLTK fails
             return text
     
+    @property
+    def pipeline(self):
+        """The current classifier pipeline"""
+        return self.model[1] if self.model else None
+    
+    @property
+    def model_version(self):
+        """Version of the current classifier"""
+        return self.model[0] if self.model else 0
+    
     def load_or_train_model(self):
         """Load existing model or train new one"""
-        model_path = 'models/intent_classifier.pkl'
-        
-        if os.path.exists(model_path):
+        if os.path.exists(self.model_path):
             try:
-                self.pipeline = joblib.load(model_path)
-                return
+                self._load_model()
+                # Retrain models saved with a different set of intents
+                if set(self.pipeline.classes_) == set(self.intent_patterns):
+                    return
             except:
                 pass
         
@@ -121,44 +175,162 @@ class NLPProcessor:
                 training_data.append(processed_text)
                 labels.append(intent)
         
+        # Include corrections collected through feedback
+        for text, intent in self.load_feedback():
+            training_data.append(self.preprocess_text(text))
+            labels.append(intent)
+        
         # Create pipeline
-        self.pipeline = Pipeline([
+        pipeline = Pipeline([
             ('tfidf', TfidfVectorizer(max_features=1000, ngram_range=(1, 2))),
             ('classifier', MultinomialNB())
         ])
         
         # Train the model
-        self.pipeline.fit(training_data, labels)
+        pipeline.fit(training_data, labels)
         
         # Save the model
-        os.makedirs('models', exist_ok=True)
-        joblib.dump(self.pipeline, 'models/intent_classifier.pkl')
+        self._publish(pipeline, self.model_version + 1)
+    
+    def _load_model(self):
+        """Load the published model and its version from disk"""
+        mtime = os.stat(self.model_path).st_mtime_ns
+        model = joblib.load(self.model_path)
+        
+        # Models saved before versioning are a bare pipeline
+        if isinstance(model, dict):
+            pipeline, version = model['pipeline'], model['version']
+        else:
+            pipeline, version = model, 0
+        
+        # A single reference assignment, so in-flight requests keep the old model
+        self.model = (version, pipeline)
+        self._model_mtime = mtime
+    
+    def _publish(self, pipeline, version):
+        """Atomically replace the on-disk model and switch to it"""
+        model_dir = os.path.dirname(self.model_path) or '.'
+        os.makedirs(model_dir, exist_ok=True)
+        
+        tmp_path = f'{self.model_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        joblib.dump({'version': version, 'pipeline': pipeline}, tmp_path)
+        os.replace(tmp_path, self.model_path)
+        
+        self.model = (version, pipeline)
+        self._model_mtime = os.stat(self.model_path).st_mtime_ns
+    
+    def maybe_reload(self, force=False):
+        """Swap to a newer published model if the file changed; cheap between requests"""
+        now = time.monotonic()
+        if not force and now - self._last_reload_check < self.reload_interval:
+            return False
+        self._last_reload_check = now
+        
+        try:
+            if os.stat(self.model_path).st_mtime_ns == self._model_mtime:
+                return False
+            self._load_model()
+            return True
+        except Exception:
+            return False
+    
+    def load_feedback(self):
+        """Return recorded (text, intent) corrections"""
+        feedback = []
+        try:
+            with open(self.feedback_path) as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    if record.get('intent') in self.intent_patterns:
+                        feedback.append((record['text'], record['intent']))
+        except OSError:
+            pass
+        return feedback
+    
+    def learn(self, text, intent, weight=5.0):
+        """Update the classifier with a corrected (text, intent) pair and publish a new version"""
+        if intent not in self.intent_patterns:
+            raise ValueError(f'Unknown intent: {intent}')
+        
+        with self._update_lock:
+            lock_file = open(self.model_path + '.lock', 'a') if fcntl else None
+            try:
+                if lock_file:
+                    # Serialize updates across workers sharing the model directory
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                
+                # Build on the latest published model, which may come from another worker
+                self.maybe_reload(force=True)
+                
+                with open(self.feedback_path, 'a') as f:
+                    f.write(json.dumps({'text': text, 'intent': intent}) + '\n')
+                
+                version, pipeline = self.model
+                # The fitted vocabulary stays fixed; only the NB counts change
+                features = pipeline.named_steps['tfidf'].transform([self.preprocess_text(text)])
+                if features.nnz == 0:
+                    return {'updated': False, 'model_version': version}
+                
+                pipeline = copy.deepcopy(pipeline)
+                pipeline.named_steps['classifier'].partial_fit(features, [intent], sample_weight=[weight])
+                self._publish(pipeline, version + 1)
+                
+                return {'updated': True, 'model_version': version + 1}
+            finally:
+                if lock_file:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+                    lock_file.close()
         
     def classify_intent(self, text):
         """Classify the intent of the input text"""
-        if not self.pipeline:
-            return 'unknown'
+        return self.predict_intent(text)[0]
+    
+    def predict_intent(self, text):
+        """Classify the intent of the input text, returning (intent, confidence, model_version)"""
+        # Read the model once; a concurrent publish swaps the tuple, never half of it
+        version, pipeline = self.model or (0, None)
+        if not pipeline:
+            return 'unknown', 0.0, version
             
         processed_text = self.preprocess_text(text)
         try:
-            predicted_intent = self.pipeline.predict([processed_text])[0]
-            confidence = max(self.pipeline.predict_proba([processed_text])[0])
+            probabilities = pipeline.predict_proba([processed_text])[0]
+            best = probabilities.argmax()
+            predicted_intent = pipeline.classes_[best]
+            confidence = float(probabilities[best])
             
-            return predicted_intent if confidence > 0.3 else 'unknown'
+            return (predicted_intent if confidence > 0.3 else 'unknown'), confidence, version
         except:
-            return 'unknown'
+            return 'unknown', 0.0, version
     
-    def text_to_sql(self, text):
+    def text_to_sql(self, text, vocabulary=None):
         """Convert natural language text to SQL query"""
-        intent = self.classify_intent(text)
+        return self.translate(text, vocabulary)[0]
+    
+    def translate(self, text, vocabulary=None):
+        """Convert natural language text to SQL, returning (sql_query, intent, confidence, model_version)
+        
+        The text is classified once, so the SQL, the intent and the version always come from the same model.
+        """
+        intent, confidence, model_version = self.predict_intent(text)
         text_lower = text.lower()
         
         # Extract entities from text
-        entities = self.extract_entities(text_lower)
+        entities = self.extract_entities(text_lower, vocabulary)
+        search = self.extract_search(text_lower)
         
         sql_query = ""
         
-        if intent == 'select_all':
+        # A cue ("named", "about", ...) overrides the classifier only when it has no intent of its own,
+        # unless the cue clearly targets records ("projects about", a quoted phrase)
+        if search is not None and search['cue'] and (intent == 'unknown' or search['explicit']):
+            intent = 'search'
+            sql_query = self.build_search_query(search)
+            
+        elif intent == 'select_all':
             if 'employee' in text_lower:
                 sql_query = "SELECT * FROM employees e JOIN departments d ON e.department_id = d.id"
             elif 'department' in text_lower:
@@ -189,10 +361,10 @@ class NLPProcessor:
             # Default fallback
             sql_query = "SELECT * FROM employees e JOIN departments d ON e.department_id = d.id LIMIT 10"
             
-        return sql_query
+        return sql_query, intent, confidence, model_version
     
-    def extract_entities(self, text):
-        """Extract entities like department names, salary values, etc."""
+    def extract_entities(self, text, vocabulary=None):
+        """Extract entities like department names, salary values, etc., using the target database's vocabulary if given"""
         entities = {
             'department': None,
             'salary': None,
@@ -201,11 +373,17 @@ class NLPProcessor:
         }
         
         # Department extraction
-        departments = ['it', 'engineering', 'marketing', 'hr', 'sales', 'finance']
-        for dept in departments:
-            if dept in text:
-                entities['department'] = dept.upper()
-                break
+        if vocabulary is not None:
+            for dept in vocabulary['departments']:
+                if re.search(r'\b' + re.escape(dept.lower()) + r'\b', text):
+                    entities['department'] = dept.upper().replace("'", "''")
+                    break
+        else:
+            departments = ['it', 'engineering', 'marketing', 'hr', 'sales', 'finance']
+            for dept in departments:
+                if dept in text:
+                    entities['department'] = dept.upper()
+                    break
         
         # Salary extraction
         salary_match = re.search(r'(\d+(?:,\d{3})*)', text)
@@ -249,6 +427,41 @@ class NLPProcessor:
         else:
             return "SELECT e.*, d.name as department_name FROM employees e JOIN departments d ON e.department_id = d.id"
     
+    def extract_search(self, text):
+        """Extract full-text search terms, the kind of record and whether a name or topic cue was used"""
+        cues = list(SEARCH_CUE.finditer(text))
+        # The last cue starts the terms: "search for projects about analytics" -> "analytics"
+        phrase = text[cues[-1].end():] if cues else text
+        terms = [word for word in re.findall(r'\w+', phrase) if word not in SEARCH_STOP_WORDS]
+        
+        if not terms:
+            return None
+        
+        kind = None
+        for candidate in ('project', 'department', 'employee'):
+            if candidate in text:
+                kind = candidate
+                break
+        
+        explicit = any(EXPLICIT_BEFORE_CUE.search(text, 0, cue.start()) or EXPLICIT_AFTER_CUE.match(text, cue.end())
+                       for cue in cues)
+        
+        names_only = bool(cues) and cues[-1].group(1) in NAME_CUES
+        if kind is None and names_only and ('who' in text or 'people' in text or 'person' in text):
+            kind = 'employee'
+        
+        return {
+            'terms': terms,
+            'kind': kind,
+            'column': 'title' if names_only else None,
+            'cue': bool(cues),
+            'explicit': explicit
+        }
+    
+    def build_search_query(self, search):
+        """Build a ranked full-text query over the search index"""
+        return build_search_sql(search['terms'], search['kind'], search['column'])
+    
     def build_aggregate_query(self, text):
         """Build aggregate SQL queries"""
         if 'average salary' in text:
@@ -0,0 +1,196 @@
+import cProfile
+import hmac
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from flask import Blueprint, Response, current_app, g, jsonify, request
+
+from app.responses import encode_json
+
+# Source files whose functions get a per-component summary in request profiles
+PROFILED_COMPONENTS = ('nlp_processor.py', 'database.py', 'speech_service.py', 'audio_processor.py')
+
+profiling_bp = Blueprint('profiling', __name__)
+
+def token_matches(token, supplied):
+    """Whether a supplied header value is the configured profiling token"""
+    return bool(token) and bool(supplied) and hmac.compare_digest(supplied, token)
+
+def _token_matches(supplied):
+    return token_matches(current_app.config['PROFILING_TOKEN'], supplied)
+
+def _function_label(key):
+    filename, lineno, name = key
+    if filename == '~':
+        return name
+    return f'{os.path.basename(filename)}:{lineno}({name})'
+
+def summarize_profile(profile, limit=25):
+    """Top functions by cumulative time plus a summary of the app's components"""
+    if not profile.getstats():
+        # Nothing ran under the profiler, e.g. a request rejected before any work
+        return {'total_ms': 0.0, 'top_functions': [], 'components': {}}
+
+    stats = pstats.Stats(profile)
+    entries = []
+    components = {}
+
+    for key, (_, calls, total, cumulative, _) in stats.stats.items():
+        entry = {
+            'function': _function_label(key),
+            'calls': calls,
+            'total_ms': round(total * 1000, 3),
+            'cumulative_ms': round(cumulative * 1000, 3)
+        }
+        entries.append(entry)
+        if key[0].endswith(PROFILED_COMPONENTS):
+            components[entry['function']] = {'calls': calls, 'cumulative_ms': entry['cumulative_ms']}
+
+    entries.sort(key=lambda entry: entry['cumulative_ms'], reverse=True)
+    return {
+        'total_ms': round(stats.total_tt * 1000, 3),
+        'top_functions': entries[:limit],
+        'components': components
+    }
+
+def start_request_profile():
+    """before_request hook: profile this request if the header carries the token"""
+    if _token_matches(request.headers.get('X-Profile')):
+        g.profiler = cProfile.Profile()
+        g.profiler.enable()
+
+def finish_request_profile(response):
+    """after_request hook: attach the request's profile to JSON responses"""
+    profiler = g.pop('profiler', None)
+    if profiler is None:
+        return response
+
+    profiler.disable()
+    if response.mimetype != 'application/json' or response.is_streamed:
+        return response
+
+    payload = current_app.json.loads(response.get_data())
+    if isinstance(payload, dict):
+        payload['profile'] = summarize_profile(profiler)
+        response.set_data(encode_json(payload))
+    return response
+
+class SamplingProfiler:
+    """Low-overhead wall-clock sampler producing collapsed stacks for flamegraphs"""
+
+    def __init__(self):
+        self._counts = Counter()
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self.interval = None
+        self.started_at = None
+        self.samples = 0
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval=0.005, max_duration=300.0):
+        """Start sampling every interval seconds, stopping by itself after max_duration"""
+        with self._lock:
+            if self.running:
+                return False
+            self._counts = Counter()
+            self._stop.clear()
+            self.interval = interval
+            self.started_at = time.time()
+            self.samples = 0
+            self._thread = threading.Thread(target=self._run, args=(max_duration,),
+                                            name='sampling-profiler', daemon=True)
+            self._thread.start()
+            return True
+
+    def stop(self):
+        """Stop sampling and return collapsed stacks"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self.collapsed()
+
+    def _run(self, max_duration):
+        own_id = threading.get_ident()
+        deadline = time.monotonic() + max_duration
+
+        while not self._stop.is_set() and time.monotonic() < deadline:
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+                    frame = frame.f_back
+                self._counts[';'.join(reversed(stack))] += 1
+            self.samples += 1
+            self._stop.wait(self.interval)
+
+    def collapsed(self):
+        """Samples in Brendan Gregg's collapsed-stack format"""
+        return ''.join(f'{stack} {count}\n' for stack, count in self._counts.most_common())
+
+    def stats(self):
+        return {
+            'running': self.running,
+            'interval': self.interval,
+            'started_at': self.started_at,
+            'samples': self.samples,
+            'stacks': len(self._counts)
+        }
+
+sampling_profiler = SamplingProfiler()
+
+@profiling_bp.before_request
+def require_admin_token():
+    if not _token_matches(request.headers.get('X-Admin-Token')):
+        return jsonify({
+            'success': False,
+            'error': 'Admin token required'
+        }), 403
+
+@profiling_bp.route('/api/admin/profiler', methods=['GET'])
+def profiler_status():
+    """Get sampling profiler status"""
+    return jsonify({
+        'success': True,
+        'profiler': sampling_profiler.stats()
+    })
+
+@profiling_bp.route('/api/admin/profiler/start', methods=['POST'])
+def start_profiler():
+    """Start the sampling profiler"""
+    data = request.get_json(silent=True) or {}
+    interval = max(float(data.get('interval_ms', 5)), 1.0) / 1000
+    max_duration = min(float(data.get('max_duration_s', 300)), 3600)
+
+    started = sampling_profiler.start(interval, max_duration)
+    return jsonify({
+        'success': started,
+        'profiler': sampling_profiler.stats(),
+        'error': None if started else 'Profiler is already running'
+    }), 200 if started else 409
+
+@profiling_bp.route('/api/admin/profiler/stop', methods=['POST'])
+def stop_profiler():
+    """Stop the sampling profiler and download collapsed stacks"""
+    collapsed = sampling_profiler.stop()
+    return Response(collapsed, mimetype='text/plain', headers={
+        'Content-Disposition': 'attachment; filename=profile.collapsed'
+    })
+
+def init_profiling(app):
+    """Register profiling hooks and admin endpoints; nothing is installed when disabled"""
+    if not app.config['PROFILING_TOKEN']:
+        return
+
+    app.before_request(start_request_profile)
+    app.after_request(finish_request_profile)
+    app.register_blueprint(profiling_bp)
@@ -0,0 +1,187 @@
+import logging
+import queue
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import text
+
+from app.models import QueryHistory
+
+class QueryHistoryLog:
+    """Write-behind log of processed queries
+
+    Requests enqueue records without touching the database. A background
+    thread drains the queue and inserts each batch with a single
+    executemany in one transaction. When the queue passes its high-water
+    mark only a sample of records is kept, and once it is full records are
+    dropped, so logging never blocks a request.
+
+    The engine should point at a database of its own (the app uses the
+    'history' bind), so history writes never touch the file queries read.
+    """
+
+    def __init__(self, engine, max_queue=10000, batch_size=500, flush_interval=1.0,
+                 high_water=0.8, sample_rate=0.1):
+        self.engine = engine
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.high_water = int(max_queue * high_water)
+        self.sample_rate = sample_rate
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        # Notified after every batch the writer finishes
+        self._progress = threading.Condition(self._lock)
+
+        self.enqueued = 0
+        self.sampled_out = 0
+        self.dropped = 0
+        self.written = 0
+        self.batches = 0
+        self.failed = 0
+
+    def start(self):
+        """Start the background writer"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='query-history-writer', daemon=True)
+            self._thread.start()
+        return self
+
+    def record(self, **fields):
+        """Queue a history record; never blocks"""
+        if self._queue.qsize() >= self.high_water and random.random() >= self.sample_rate:
+            with self._lock:
+                self.sampled_out += 1
+            return False
+
+        fields.setdefault('created_at', datetime.utcnow())
+        try:
+            self._queue.put_nowait(fields)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+
+        with self._lock:
+            self.enqueued += 1
+        return True
+
+    def _drain(self, timeout):
+        """Collect up to batch_size records, waiting up to timeout for the first"""
+        try:
+            batch = [self._queue.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        try:
+            # One transaction and one executemany per batch
+            with self.engine.begin() as conn:
+                conn.execute(QueryHistory.__table__.insert(), batch)
+            with self._progress:
+                self.written += len(batch)
+                self.batches += 1
+                self._progress.notify_all()
+        except Exception as e:
+            logging.error(f"Error writing query history: {str(e)}")
+            with self._progress:
+                self.failed += len(batch)
+                self._progress.notify_all()
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._drain(self.flush_interval)
+            if batch:
+                self._write(batch)
+
+    def wait(self, timeout):
+        """Wait up to timeout for the writer to persist everything queued so far
+
+        Returns True once it has; the caller's thread never writes.
+        """
+        deadline = time.monotonic() + timeout
+        with self._progress:
+            target = self.enqueued
+            while self.written + self.failed < target:
+                remaining = deadline - time.monotonic()
+                if self._thread is None or remaining <= 0:
+                    return False
+                self._progress.wait(remaining)
+        return True
+
+    def flush(self):
+        """Write everything queued so far from the calling thread"""
+        while True:
+            batch = self._drain(0)
+            if not batch:
+                return
+            self._write(batch)
+
+    def close(self):
+        """Stop the writer and flush what is left"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(self.flush_interval * 2)
+            self._thread = None
+        self.flush()
+
+    def stats(self):
+        """Queue and writer counters"""
+        with self._lock:
+            return {
+                'queued': self._queue.qsize(),
+                'enqueued': self.enqueued,
+                'written': self.written,
+                'batches': self.batches,
+                'sampled_out': self.sampled_out,
+                'dropped': self.dropped,
+                'failed': self.failed
+            }
+
+def get_history_stats(connection, limit=10, hours=None):
+    """Aggregate query history: totals, top queries and slowest intents"""
+    where = ''
+    params = {'limit': limit}
+    if hours:
+        where = 'WHERE created_at >= :since'
+        params['since'] = datetime.utcnow() - timedelta(hours=hours)
+
+    totals = connection.execute(text(
+        f"SELECT COUNT(*), AVG(latency_ms), MAX(latency_ms) FROM query_history {where}"
+    ), params).fetchone()
+
+    top_queries = connection.execute(text(
+        f"SELECT normalized_query, COUNT(*) AS count, AVG(latency_ms) AS avg_latency_ms "
+        f"FROM query_history {where} GROUP BY normalized_query ORDER BY count DESC LIMIT :limit"
+    ), params).fetchall()
+
+    slowest_intents = connection.execute(text(
+        f"SELECT intent, COUNT(*) AS count, AVG(latency_ms) AS avg_latency_ms, "
+        f"MAX(latency_ms) AS max_latency_ms, AVG(confidence) AS avg_confidence "
+        f"FROM query_history {where} GROUP BY intent ORDER BY avg_latency_ms DESC LIMIT :limit"
+    ), params).fetchall()
+
+    return {
+        'total_queries': totals[0],
+        'avg_latency_ms': totals[1],
+        'max_latency_ms': totals[2],
+        'top_queries': [
+            {'query': row[0], 'count': row[1], 'avg_latency_ms': row[2]}
+            for row in top_queries
+        ],
+        'slowest_intents': [
+            {'intent': row[0], 'count': row[1], 'avg_latency_ms': row[2],
+             'max_latency_ms': row[3], 'avg_confidence': row[4]}
+            for row in slowest_intents
+        ]
+    }
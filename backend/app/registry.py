@@ -0,0 +1,284 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+import logging
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+
+from app.database import describe_tables, read_vocabulary
+
+def parse_databases(spec, directory=None):
+    """Map database names to SQLite paths from 'name=path,...' and every *.db in directory"""
+    databases = {}
+
+    if directory:
+        for path in sorted(Path(directory).glob('*.db')):
+            databases[path.stem] = str(path)
+
+    for item in (spec or '').split(','):
+        if not item.strip():
+            continue
+        name, _, path = item.partition('=')
+        if not path.strip():
+            raise ValueError(f"Expected name=path in DATABASES, got '{item.strip()}'")
+        databases[name.strip()] = path.strip()
+
+    return databases
+
+class DatabaseHandle:
+    """Lazily opened, read-only connection pool for one SQLite database
+
+    The schema catalog and entity vocabulary are read once and reused
+    until the database file changes on disk.
+    """
+
+    def __init__(self, name, path, pool_size=4, checkout_timeout=30.0):
+        self.name = name
+        self.path = os.path.abspath(path)
+        self.pool_size = pool_size
+        self.checkout_timeout = checkout_timeout
+        self.last_used = time.monotonic()
+
+        self._lock = threading.Lock()
+        self._pool = queue.LifoQueue()
+        self._opened = 0
+        self._in_use = 0
+        # Requests holding the handle from DatabaseRegistry.get(); changed under the registry lock
+        self.leases = 0
+        self._generation = 0
+        self._catalog = None
+        self._signature = None
+
+    def _connect(self):
+        connection = sqlite3.connect(Path(self.path).as_uri() + '?mode=ro', uri=True, check_same_thread=False)
+        connection.execute('PRAGMA query_only = ON')
+        return connection
+
+    def _disk_signature(self):
+        """Modification signature of the database file and its WAL"""
+        signature = []
+        for path in (self.path, self.path + '-wal'):
+            try:
+                stat = os.stat(path)
+                signature.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+
+    @property
+    def is_open(self):
+        return self._opened > 0
+
+    @property
+    def in_use(self):
+        return self._in_use + self.leases
+
+    @contextmanager
+    def connection(self):
+        """Check a connection out of the pool, opening one if the pool is not full"""
+        with self._lock:
+            self._in_use += 1
+            self.last_used = time.monotonic()
+            generation = self._generation
+            connect = self._pool.empty() and self._opened < self.pool_size
+            if connect:
+                self._opened += 1
+
+        connection = None
+        try:
+            connection = self._connect() if connect else self._pool.get(timeout=self.checkout_timeout)
+            yield connection
+        except BaseException:
+            if connect and connection is None:
+                with self._lock:
+                    self._opened -= 1
+            raise
+        finally:
+            with self._lock:
+                self._in_use -= 1
+                self.last_used = time.monotonic()
+                if connection is not None and generation != self._generation:
+                    # The handle was closed while this connection was checked out
+                    connection.close()
+                    self._opened -= 1
+                    connection = None
+            if connection is not None:
+                self._pool.put(connection)
+
+    def execute(self, query):
+        """Run a read-only query, returning (columns, rows)"""
+        with self.connection() as connection:
+            cursor = connection.execute(query)
+            columns = [column[0] for column in cursor.description or []]
+            return columns, cursor.fetchall()
+
+    def iter_batches(self, query, batch_size=5000):
+        """Run a read-only query and return (columns, batches), holding a connection until exhausted"""
+        checkout = self.connection()
+        connection = checkout.__enter__()
+        try:
+            cursor = connection.execute(query)
+        except BaseException as e:
+            checkout.__exit__(type(e), e, e.__traceback__)
+            raise
+        columns = [column[0] for column in cursor.description or []]
+
+        def batches():
+            try:
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    yield rows
+            finally:
+                cursor.close()
+                checkout.__exit__(None, None, None)
+
+        return columns, batches()
+
+    def catalog(self):
+        """Schema and entity vocabulary, re-read only when the file has changed"""
+        signature = self._disk_signature()
+        catalog = self._catalog
+        if catalog is not None and signature == self._signature:
+            return catalog
+
+        with self.connection() as connection:
+            execute = lambda sql: connection.execute(sql).fetchall()
+            schema = describe_tables(execute)
+            catalog = {
+                'schema': schema,
+                'vocabulary': read_vocabulary(execute, [table['name'] for table in schema['tables']])
+            }
+
+        self._catalog = catalog
+        self._signature = signature
+        return catalog
+
+    def close(self):
+        """Close pooled connections and drop the cached catalog; connections in use close on return"""
+        with self._lock:
+            closed = 0
+            while True:
+                try:
+                    self._pool.get_nowait().close()
+                    closed += 1
+                except queue.Empty:
+                    break
+            self._opened -= closed
+            self._generation += 1
+            self._catalog = None
+            self._signature = None
+
+    def stats(self):
+        return {
+            'name': self.name,
+            'open_connections': self._opened,
+            'in_use': self._in_use,
+            'leases': self.leases,
+            'catalog_cached': self._catalog is not None,
+            'idle_seconds': round(time.monotonic() - self.last_used, 3)
+        }
+
+class DatabaseRegistry:
+    """Named SQLite databases served from one process
+
+    Handles open lazily on first use. Past max_open databases, or after
+    idle_timeout seconds without use, the least recently used idle
+    databases are closed. get() leases a handle and release() returns it;
+    a leased handle is never closed by eviction.
+    """
+
+    def __init__(self, databases, max_open=8, idle_timeout=300.0, pool_size=4):
+        self.max_open = max_open
+        self.idle_timeout = idle_timeout
+        self.evictions = 0
+
+        self._handles = {name: DatabaseHandle(name, path, pool_size) for name, path in databases.items()}
+        self._open = OrderedDict()
+        self._lock = threading.Lock()
+
+    def names(self):
+        return sorted(self._handles)
+
+    def __contains__(self, name):
+        return name in self._handles
+
+    def get(self, name):
+        """Lease the handle for a named database, marking it most recently used; pair with release()"""
+        handle = self._handles.get(name)
+        if handle is None:
+            raise KeyError(name)
+
+        with self._lock:
+            # Leased before eviction runs, so no other get() can close it from here on
+            handle.leases += 1
+            self._open[name] = handle
+            self._open.move_to_end(name)
+            self._evict()
+
+        return handle
+
+    def release(self, handle):
+        """Return a handle leased by get()"""
+        with self._lock:
+            handle.leases -= 1
+            handle.last_used = time.monotonic()
+
+    @contextmanager
+    def checkout(self, name):
+        """Lease a named database for the duration of a with block"""
+        handle = self.get(name)
+        try:
+            yield handle
+        finally:
+            self.release(handle)
+
+    def _evict(self):
+        """Close least recently used idle databases past the cap or the idle timeout"""
+        now = time.monotonic()
+        excess = len(self._open) - self.max_open
+
+        for name, handle in list(self._open.items())[:-1]:
+            if handle.in_use:
+                continue
+            if excess <= 0 and now - handle.last_used < self.idle_timeout:
+                continue
+            handle.close()
+            del self._open[name]
+            excess -= 1
+            self.evictions += 1
+            logging.info(f"Closed idle database '{name}'")
+
+    def close(self):
+        with self._lock:
+            for handle in self._open.values():
+                handle.close()
+            self._open.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'databases': len(self._handles),
+                'open': [handle.stats() for handle in self._open.values()],
+                'max_open': self.max_open,
+                'evictions': self.evictions
+            }
+
+def init_database_registry(app):
+    """Create the registry of named databases when any are configured"""
+    databases = parse_databases(app.config['DATABASES'], app.config['DATABASE_DIR'])
+    if not databases:
+        return None
+
+    registry = DatabaseRegistry(
+        databases,
+        max_open=app.config['DATABASE_MAX_OPEN'],
+        idle_timeout=app.config['DATABASE_IDLE_TIMEOUT'],
+        pool_size=app.config['DATABASE_POOL_SIZE']
+    )
+    app.extensions['databases'] = registry
+    return registry
@@ -0,0 +1,217 @@
+import atexit
+import os
+import sqlite3
+import threading
+import time
+import logging
+from contextlib import contextmanager
+from pathlib import Path
+
+from app import db
+
+class ReadReplica:
+    """In-memory, read-only copy of an on-disk SQLite database
+
+    Each sync copies the file into a new shared-cache generation. A
+    generation lives as long as any connection to it: readers connect
+    under the same lock a sync swaps generations under, so by the time the
+    previous master is closed, every reader of that generation already
+    holds a connection keeping it alive.
+
+    Reader connections are shared through a small pool of the current
+    generation. A sync closes the idle ones, and connections checked out
+    across a sync are closed when returned, so no idle connection keeps an
+    old copy alive. A background thread started by start() re-syncs when
+    the file changes, so requests never wait for a copy.
+    """
+
+    def __init__(self, db_path, sync_interval=5.0, pool_size=4):
+        self.db_path = os.path.abspath(db_path)
+        self.sync_interval = sync_interval
+        self.pool_size = pool_size
+        self.sync_count = 0
+        self.last_sync = None
+
+        self._name = f"neuroquery_replica_{os.getpid()}_{id(self)}"
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._idle = []
+        self._in_use = 0
+        self._master = None
+        self._generation = 0
+        self._signature = None
+
+        self.sync()
+
+    def _uri(self, generation):
+        """Shared-cache URI of the in-memory database for a generation"""
+        return f"file:{self._name}_{generation}?mode=memory&cache=shared"
+
+    def _disk_signature(self):
+        """Modification signature of the database file and its WAL"""
+        signature = []
+        for path in (self.db_path, self.db_path + '-wal'):
+            try:
+                stat = os.stat(path)
+                signature.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+
+    def start(self):
+        """Start the background sync thread"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='read-replica-sync', daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.sync_interval):
+            try:
+                self.maybe_sync()
+            except Exception as e:
+                logging.error(f"Error syncing read replica: {str(e)}")
+
+    def sync(self):
+        """Copy the on-disk database into a fresh in-memory generation"""
+        with self._sync_lock:
+            signature = self._disk_signature()
+            generation = self._generation + 1
+
+            # The master connection keeps the in-memory database alive; readers are not blocked by the copy
+            master = sqlite3.connect(self._uri(generation), uri=True, check_same_thread=False)
+            source = sqlite3.connect(Path(self.db_path).as_uri() + '?mode=ro', uri=True)
+            try:
+                source.backup(master)
+            finally:
+                source.close()
+
+            with self._lock:
+                previous = self._master
+                stale = self._idle
+                self._master = master
+                self._idle = []
+                self._generation = generation
+                self._signature = signature
+                self.sync_count += 1
+                self.last_sync = time.time()
+
+                # No reader is between reading the old generation and connecting to it,
+                # so the old generation stays alive while any of its readers remain
+                if previous is not None:
+                    previous.close()
+
+            for connection in stale:
+                connection.close()
+
+    def maybe_sync(self):
+        """Re-sync from disk if the file changed since the last sync"""
+        if self._disk_signature() == self._signature:
+            return False
+
+        self.sync()
+        return True
+
+    @contextmanager
+    def connection(self):
+        """Check out a read-only connection to the current generation"""
+        with self._lock:
+            self._in_use += 1
+            generation = self._generation
+            connection = self._idle.pop() if self._idle else None
+            if connection is None:
+                # Read the generation and connect to it as one step against sync()
+                connection = sqlite3.connect(self._uri(generation), uri=True, check_same_thread=False)
+                connection.execute('PRAGMA query_only = ON')
+
+        try:
+            yield connection
+        finally:
+            with self._lock:
+                self._in_use -= 1
+                # Keep only current-generation connections, and only a few
+                keep = generation == self._generation and len(self._idle) < self.pool_size
+                if keep:
+                    self._idle.append(connection)
+            if not keep:
+                connection.close()
+
+    def execute(self, query):
+        """Run a read-only query and return (columns, rows)"""
+        with self.connection() as connection:
+            cursor = connection.execute(query)
+            try:
+                columns = [column[0] for column in cursor.description or []]
+                rows = cursor.fetchall()
+            finally:
+                cursor.close()
+        return columns, rows
+
+    def iter_batches(self, query, batch_size=5000):
+        """Run a read-only query and return (columns, batches), holding a connection until exhausted"""
+        checkout = self.connection()
+        connection = checkout.__enter__()
+        try:
+            cursor = connection.execute(query)
+        except BaseException as e:
+            checkout.__exit__(type(e), e, e.__traceback__)
+            raise
+        columns = [column[0] for column in cursor.description or []]
+
+        def batches():
+            try:
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    yield rows
+            finally:
+                cursor.close()
+                checkout.__exit__(None, None, None)
+
+        return columns, batches()
+
+    def stats(self):
+        """Replica status for health reporting"""
+        return {
+            'generation': self._generation,
+            'sync_count': self.sync_count,
+            'last_sync': self.last_sync,
+            'sync_interval': self.sync_interval,
+            'idle_connections': len(self._idle),
+            'in_use': self._in_use
+        }
+
+    def close(self):
+        """Stop syncing and release the in-memory database"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+        with self._lock:
+            idle = self._idle
+            self._idle = []
+            # Connections still checked out close when they are returned
+            self._generation += 1
+            if self._master is not None:
+                self._master.close()
+                self._master = None
+
+        for connection in idle:
+            connection.close()
+
+def init_read_replica(app):
+    """Attach an in-memory read replica to the app if the database is a SQLite file"""
+    url = db.engine.url
+
+    if url.get_backend_name() != 'sqlite' or url.database in (None, '', ':memory:'):
+        logging.warning("Read replica requires a file-backed SQLite database; serving from disk")
+        return None
+
+    replica = ReadReplica(url.database, app.config['READ_REPLICA_SYNC_INTERVAL']).start()
+    app.extensions['read_replica'] = replica
+    atexit.register(replica.close)
+    return replica
@@ -0,0 +1,140 @@
+import gzip
+import json
+import decimal
+from flask import request, current_app
+from flask.json.provider import JSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+def _default(obj):
+    """Serialize types neither encoder handles natively"""
+    if isinstance(obj, decimal.Decimal):
+        return str(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if isinstance(obj, bytes):
+        return obj.decode('utf-8', errors='replace')
+    if hasattr(obj, 'isoformat'):
+        return obj.isoformat()
+    if hasattr(obj, '_asdict'):
+        return obj._asdict()
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+def _finite(obj):
+    """Replace NaN and infinity with None so the stdlib encoder emits valid JSON"""
+    if isinstance(obj, float):
+        return obj if obj == obj and obj not in (float('inf'), float('-inf')) else None
+    if isinstance(obj, dict):
+        return {key: _finite(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_finite(value) for value in obj]
+    return obj
+
+def encode_json(obj):
+    """Encode obj as compact JSON bytes
+
+    Dates and datetimes become ISO 8601 strings, and NaN/infinity become
+    null (the stdlib encoder would emit invalid JSON for them).
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(_finite(obj), default=_default, separators=(',', ':'), allow_nan=False).encode()
+
+class FastJSONProvider(JSONProvider):
+    """Flask JSON provider backed by orjson when it is installed"""
+
+    def dumps(self, obj, **kwargs):
+        return encode_json(obj).decode()
+
+    def loads(self, s, **kwargs):
+        if orjson is not None:
+            return orjson.loads(s)
+        return json.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(encode_json(obj), mimetype='application/json')
+
+def available_encodings():
+    """Content codings this process can produce, most preferred first"""
+    encodings = []
+    if zstandard is not None:
+        encodings.append('zstd')
+    if brotli is not None:
+        encodings.append('br')
+    encodings.append('gzip')
+    return encodings
+
+def negotiate_encoding(accept_encoding):
+    """Pick the best supported coding from an Accept-Encoding header, or None"""
+    accepted = {}
+    for part in (accept_encoding or '').split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding] = quality
+
+    candidates = [
+        coding for coding in available_encodings()
+        if accepted.get(coding, accepted.get('*', 0.0)) > 0
+    ]
+    if not candidates:
+        return None
+
+    # Highest client quality wins; ties go to our preference order
+    return max(candidates, key=lambda coding: accepted.get(coding, accepted.get('*', 0.0)))
+
+def compress(body, encoding):
+    """Compress body with the given content coding"""
+    if encoding == 'zstd':
+        return zstandard.ZstdCompressor(level=3).compress(body)
+    if encoding == 'br':
+        return brotli.compress(body, quality=4)
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=5)
+    raise ValueError(f'Unsupported content coding: {encoding}')
+
+def compress_response(response):
+    """after_request hook that compresses JSON responses above the size threshold"""
+    min_bytes = current_app.config['RESPONSE_COMPRESSION_MIN_BYTES']
+    if min_bytes <= 0 or response.direct_passthrough or response.is_streamed:
+        return response
+
+    if response.mimetype != 'application/json' or 'Content-Encoding' in response.headers:
+        return response
+
+    response.vary.add('Accept-Encoding')
+
+    body = response.get_data()
+    if len(body) < min_bytes:
+        return response
+
+    encoding = negotiate_encoding(request.headers.get('Accept-Encoding'))
+    if encoding is None:
+        return response
+
+    response.set_data(compress(body, encoding))
+    response.headers['Content-Encoding'] = encoding
+    return response
@@ -1,8 +1,18 @@
-from flask import Blueprint, request, jsonify
-from app.nlp_processor import NLPProcessor
+from flask import Blueprint, Response, request, jsonify, current_app, stream_with_context, g, has_request_context
+from werkzeug.exceptions import RequestEntityTooLarge
+from app.nlp_processor import NLPProcessor, SEARCH_EXAMPLES
 from app.speech_service import SpeechService
-from app.database import execute_sql_query, get_database_schema
+from app.audio_processor import AudioProcessor
+from app.database import execute_sql_query, get_database_schema, iter_query_batches, declared_column_types, probe_column_types
+from app.exporter import EXPORT_FORMATS, available_formats, stream_export
+from app.coalescing import normalize_query
+from app.query_history import get_history_stats
+from app.suggest import SuggestionIndex, SchemaSuggestions, HistorySuggestions
+from app.admission import Rejected, classify
+from app.profiling import token_matches
+from app import db
 import logging
+import time
 
 # Create blueprint
 bp = Blueprint('main', __name__)
@@ -10,54 +20,288 @@ bp = Blueprint('main', __name__)
 # Initialize services
 nlp_processor = NLPProcessor()
 speech_service = SpeechService()
+audio_processor = AudioProcessor()
+
+# Example queries shown to users and seeded into suggestions
+QUERY_EXAMPLES = [
+    {
+        'text': 'Show all employees',
+        'description': 'Display all employees with their department information'
+    },
+    {
+        'text': 'How many employees work in IT?',
+        'description': 'Count employees in the IT department'
+    },
+    {
+        'text': 'Show employees with salary greater than 70000',
+        'description': 'Filter employees by salary threshold'
+    },
+    {
+        'text': 'What is the average salary?',
+        'description': 'Calculate average salary across all employees'
+    },
+    {
+        'text': 'List employees hired after 2020',
+        'description': 'Show recently hired employees'
+    },
+    {
+        'text': 'Show all projects',
+        'description': 'Display all projects in the database'
+    },
+    {
+        'text': 'Count employees in each department',
+        'description': 'Group employees by department'
+    },
+    {
+        'text': 'Show highest paid employee',
+        'description': 'Find the employee with maximum salary'
+    }
+]
+
+# Name of the application's own database; other names are looked up in the registry
+DEFAULT_DATABASE = 'default'
+
+# Autocomplete index seeded from known patterns and examples
+suggestion_index = SuggestionIndex()
+schema_suggestions = SchemaSuggestions(suggestion_index)
+history_suggestions = HistorySuggestions(suggestion_index)
+for patterns in nlp_processor.intent_patterns.values():
+    for pattern in patterns:
+        suggestion_index.add(pattern, 'pattern')
+for pattern in SEARCH_EXAMPLES:
+    suggestion_index.add(pattern, 'pattern')
+for example in QUERY_EXAMPLES:
+    suggestion_index.add(example['text'], 'example')
+
+def validate_query_request(data):
+    """Extract the query text from a request body, returning (query_text, error)"""
+    if not data or 'query' not in data:
+        return None, 'Query text is required'
+    
+    query_text = data['query'].strip()
+    
+    if not query_text:
+        return None, 'Query text cannot be empty'
+    
+    return query_text, None
+
+def validate_sql_request(data):
+    """Extract a read-only SQL statement from a request body, returning (sql_query, error)"""
+    if not data or 'sql' not in data:
+        return None, 'SQL query is required'
+    
+    sql_query = data['sql'].strip()
+    
+    if not sql_query:
+        return None, 'SQL query cannot be empty'
+    
+    # Basic SQL injection protection (very basic - implement proper sanitization)
+    dangerous_keywords = ['DROP', 'DELETE', 'UPDATE', 'INSERT', 'ALTER', 'CREATE']
+    sql_upper = sql_query.upper()
+    
+    for keyword in dangerous_keywords:
+        if keyword in sql_upper:
+            return None, f'Dangerous SQL operation detected: {keyword}. Only SELECT queries are allowed.'
+    
+    return sql_query, None
+
+def resolve_database(name):
+    """Look up a target database by name, returning (database, error); None means the application database
+    
+    The database stays leased until the request ends, or until release_database() outside a request.
+    """
+    if not name or name == DEFAULT_DATABASE:
+        return None, None
+    
+    registry = current_app.extensions.get('databases')
+    
+    if registry is None or name not in registry:
+        return None, f"Unknown database '{name}'"
+    
+    database = registry.get(name)
+    if has_request_context():
+        g.setdefault('databases', []).append(database)
+    return database, None
+
+def release_database(database):
+    """Return a database leased by resolve_database"""
+    if database is not None:
+        current_app.extensions['databases'].release(database)
+
+def translate_query(query_text, database=None):
+    """Convert natural language to SQL, returning (sql_query, intent, confidence, model_version)"""
+    # Entity names come from the target database's cached vocabulary
+    vocabulary = database.catalog()['vocabulary'] if database is not None else None
+    return nlp_processor.translate(query_text, vocabulary)
+
+def run_query(query_text, database=None):
+    """Translate and execute a natural language query, returning (sql_query, intent, confidence, model_version, query_result)"""
+    def compute():
+        sql_query, intent, confidence, model_version = translate_query(query_text, database)
+        return sql_query, intent, confidence, model_version, execute_sql_query(sql_query, database)
+    
+    coalescer = current_app.extensions.get('coalescer')
+    if coalescer is None:
+        return compute()
+    
+    # Concurrent identical queries against the same database share one translation and execution
+    scope = database.name if database is not None else DEFAULT_DATABASE
+    return coalescer.do(f'query:{scope}:' + normalize_query(query_text), compute)
+
+def run_sql(sql_query, database=None):
+    """Execute a validated SQL query, sharing the execution with identical in-flight queries"""
+    coalescer = current_app.extensions.get('coalescer')
+    if coalescer is None:
+        return execute_sql_query(sql_query, database)
+    
+    scope = database.name if database is not None else DEFAULT_DATABASE
+    return coalescer.do(f'sql:{scope}:' + sql_query, lambda: execute_sql_query(sql_query, database))
+
+def record_query(source, query_text, sql_query, intent, confidence, query_result, started):
+    """Count the query toward suggestion popularity and queue a history record"""
+    suggestion_index.bump(query_text)
+    
+    history = current_app.extensions.get('query_history')
+    if history is None:
+        return
+    
+    history.record(
+        source=source,
+        query_text=query_text,
+        normalized_query=normalize_query(query_text),
+        sql_query=sql_query,
+        intent=intent,
+        confidence=confidence,
+        row_count=query_result['row_count'],
+        latency_ms=(time.perf_counter() - started) * 1000,
+        success=query_result['error'] is None
+    )
+
+def query_payload(query_text, sql_query, intent, model_version, query_result):
+    """Response body for a natural language query"""
+    return {
+        'success': True,
+        'original_query': query_text,
+        'sql_query': sql_query,
+        'intent': intent,
+        'model_version': model_version,
+        'results': query_result['data'],
+        'columns': query_result['columns'],
+        'row_count': query_result['row_count'],
+        'error': query_result['error']
+    }
+
+def sql_payload(sql_query, query_result):
+    """Response body for a direct SQL query"""
+    return {
+        'success': True,
+        'sql_query': sql_query,
+        'results': query_result['data'],
+        'columns': query_result['columns'],
+        'row_count': query_result['row_count'],
+        'error': query_result['error']
+    }
+
+@bp.record
+def configure_services(state):
+    """Apply app configuration to the shared services"""
+    nlp_processor.reload_interval = state.app.config['MODEL_RELOAD_INTERVAL']
+    schema_suggestions.refresh_interval = state.app.config['SUGGEST_REFRESH_INTERVAL']
+    history_suggestions.refresh_interval = state.app.config['SUGGEST_REFRESH_INTERVAL']
+
+@bp.before_app_request
+def refresh_intent_model():
+    """Pick up a newly published intent model between requests"""
+    nlp_processor.maybe_reload()
+
+@bp.before_request
+def admit_request():
+    """Hold the request until its endpoint class has a free slot, or shed it"""
+    admission = current_app.extensions.get('admission')
+    endpoint_class = classify(request.method, request.path)
+    
+    if admission is None or admission.handled_upstream or endpoint_class is None:
+        return None
+    
+    try:
+        g.admission_ticket = admission.acquire(endpoint_class)
+    except Rejected as e:
+        return jsonify({
+            'success': False,
+            'error': e.reason
+        }), e.status, {'Retry-After': str(e.retry_after)}
+
+@bp.teardown_request
+def release_admission(error=None):
+    """Free the request's slot once the response, including any stream, is done"""
+    ticket = g.pop('admission_ticket', None)
+    
+    if ticket is not None:
+        current_app.extensions['admission'].release(ticket)
+
+@bp.teardown_request
+def release_databases(error=None):
+    """Return the databases the request leased once the response, including any stream, is done"""
+    for database in g.pop('databases', []):
+        release_database(database)
 
 @bp.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
-    return jsonify({
+    health = {
         'status': 'healthy',
         'message': 'AI Query Assistant API is running'
-    })
+    }
+    
+    replica = current_app.extensions.get('read_replica')
+    if replica is not None:
+        health['read_replica'] = replica.stats()
+    
+    transcript_cache = current_app.extensions.get('transcript_cache')
+    if transcript_cache is not None:
+        health['transcript_cache'] = transcript_cache.stats()
+    
+    coalescer = current_app.extensions.get('coalescer')
+    if coalescer is not None:
+        health['coalescing'] = coalescer.stats()
+    
+    export_stats = current_app.extensions.get('export_stats')
+    if export_stats is not None:
+        health['exports'] = export_stats.stats()
+    
+    registry = current_app.extensions.get('databases')
+    if registry is not None:
+        health['databases'] = registry.stats()
+    
+    admission = current_app.extensions.get('admission')
+    if admission is not None:
+        health['admission'] = admission.stats()
+    
+    return jsonify(health)
 
 @bp.route('/api/query', methods=['POST'])
 def process_query():
     """Process natural language query and return SQL results"""
     try:
+        started = time.perf_counter()
         data = request.get_json()
+        query_text, error = validate_query_request(data)
+        database, database_error = resolve_database(data.get('database') if data else None)
         
-        if not data or 'query' not in data:
+        if error or database_error:
             return jsonify({
                 'success': False,
-                'error': 'Query text is required'
+                'error': error or database_error
             }), 400
         
-        query_text = data['query'].strip()
+        # Convert natural language to SQL and execute it
+        sql_query, intent, confidence, model_version, query_result = run_query(query_text, database)
+        record_query('text', query_text, sql_query, intent, confidence, query_result, started)
         
-        if not query_text:
-            return jsonify({
-                'success': False,
-                'error': 'Query text cannot be empty'
-            }), 400
-        
-        # Convert natural language to SQL
-        sql_query = nlp_processor.text_to_sql(query_text)
-        
-        # Execute SQL query
-        query_result = execute_sql_query(sql_query)
+        return jsonify(query_payload(query_text, sql_query, intent, model_version, query_result))
         
-        # Get intent classification for debugging
-        intent = nlp_processor.classify_intent(query_text)
-        
-        return jsonify({
-            'success': True,
-            'original_query': query_text,
-            'sql_query': sql_query,
-            'intent': intent,
-            'results': query_result['data'],
-            'columns': query_result['columns'],
-            'row_count': query_result['row_count'],
-            'error': query_result['error']
-        })
+    except RequestEntityTooLarge:
+        raise
         
     except Exception as e:
         logging.error(f"Error processing query: {str(e)}")
@@ -70,6 +314,9 @@ def process_query():
 def process_voice():
     """Process voice input and return transcribed text"""
     try:
+        started = time.perf_counter()
+        max_bytes = current_app.config['VOICE_MAX_UPLOAD_BYTES']
+        
         if 'audio' not in request.files:
             return jsonify({
                 'success': False,
@@ -84,37 +331,96 @@ def process_voice():
                 'error': 'No audio file selected'
             }), 400
         
-        # Read audio data
-        audio_data = audio_file.read()
+        database, error = resolve_database(request.form.get('database'))
         
-        # Convert speech to text
-        speech_result = speech_service.audio_to_text(audio_data)
+        if error:
+            return jsonify({
+                'success': False,
+                'error': error
+            }), 400
+        
+        # MAX_CONTENT_LENGTH bounds the whole body; the clip itself is capped as it is read
+        upload = audio_processor.read_upload(audio_file.stream, max_bytes)
+        
+        if not upload['success']:
+            return jsonify({
+                'success': False,
+                'error': upload['error']
+            }), 413
+        
+        preprocessing = current_app.config['AUDIO_PREPROCESSING']
+        transcript_cache = current_app.extensions.get('transcript_cache')
+        normalized = None
+        audio_stats = None
+        
+        if preprocessing or transcript_cache is not None:
+            # Downmix and resample to 16 kHz mono; the samples also key the transcript cache
+            normalized = audio_processor.normalize(upload['data'])
+            
+            if preprocessing:
+                audio_stats = normalized['stats']
+                
+                if not normalized['success']:
+                    return jsonify({
+                        'success': False,
+                        'error': normalized['error'],
+                        'audio': audio_stats
+                    }), 400
+        
+        def recognize():
+            """Trim silence and convert speech to text, or recognize the raw upload"""
+            nonlocal audio_stats
+            
+            if not preprocessing:
+                return speech_service.audio_to_text(upload['data'])
+            
+            processed = audio_processor.process(upload['data'], normalized)
+            audio_stats = processed['stats']
+            
+            if not processed['success']:
+                return {'success': False, 'text': None, 'error': processed['error']}
+            return speech_service.pcm_to_text(processed['pcm'], processed['sample_rate'], processed['sample_width'])
+        
+        if transcript_cache is not None and normalized['success']:
+            # Replayed clips normalize to identical samples and skip trimming and recognition
+            speech_result = transcript_cache.recognize(normalized['pcm'], normalized['sample_rate'], recognize)
+        else:
+            speech_result = recognize()
         
         if not speech_result['success']:
             return jsonify({
                 'success': False,
-                'error': speech_result['error']
+                'error': speech_result['error'],
+                'audio': audio_stats
             }), 400
         
         # Process the transcribed text as a query
         query_text = speech_result['text']
         
         # Convert to SQL and execute
-        sql_query = nlp_processor.text_to_sql(query_text)
-        query_result = execute_sql_query(sql_query)
-        intent = nlp_processor.classify_intent(query_text)
+        sql_query, intent, confidence, model_version, query_result = run_query(query_text, database)
+        record_query('voice', query_text, sql_query, intent, confidence, query_result, started)
         
         return jsonify({
             'success': True,
             'transcribed_text': query_text,
             'sql_query': sql_query,
             'intent': intent,
+            'model_version': model_version,
             'results': query_result['data'],
             'columns': query_result['columns'],
             'row_count': query_result['row_count'],
+            'audio': audio_stats,
+            'transcript_cached': speech_result.get('cached', False),
             'error': query_result['error']
         })
         
+    except RequestEntityTooLarge:
+        return jsonify({
+            'success': False,
+            'error': f'Audio file exceeds the {max_bytes} byte limit'
+        }), 413
+        
     except Exception as e:
         logging.error(f"Error processing voice input: {str(e)}")
         return jsonify({
@@ -126,7 +432,15 @@ def process_voice():
 def get_schema():
     """Get database schema information"""
     try:
-        schema_result = get_database_schema()
+        database, error = resolve_database(request.args.get('database'))
+        
+        if error:
+            return jsonify({
+                'success': False,
+                'error': error
+            }), 400
+        
+        schema_result = get_database_schema(database)
         
         return jsonify({
             'success': schema_result['success'],
@@ -146,92 +460,222 @@ def execute_direct_sql():
     """Execute direct SQL query (for advanced users)"""
     try:
         data = request.get_json()
+        sql_query, error = validate_sql_request(data)
+        database, database_error = resolve_database(data.get('database') if data else None)
+        
+        if error or database_error:
+            return jsonify({
+                'success': False,
+                'error': error or database_error
+            }), 400
+        
+        # Execute SQL query
+        query_result = run_sql(sql_query, database)
+        
+        return jsonify(sql_payload(sql_query, query_result))
+        
+    except RequestEntityTooLarge:
+        raise
+        
+    except Exception as e:
+        logging.error(f"Error executing SQL: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': f'Internal server error: {str(e)}'
+        }), 500
+
+@bp.route('/api/export', methods=['POST'])
+def export_results():
+    """Stream the full result of a query as CSV, Parquet or Arrow IPC"""
+    try:
+        data = request.get_json() or {}
+        export_format = (data.get('format') or 'csv').lower()
+        
+        if export_format not in available_formats():
+            return jsonify({
+                'success': False,
+                'error': f"Unsupported export format '{export_format}'. Available: {', '.join(available_formats())}"
+            }), 400
+        
+        database, error = resolve_database(data.get('database'))
+        
+        if error:
+            return jsonify({
+                'success': False,
+                'error': error
+            }), 400
+        
+        if 'sql' in data:
+            sql_query, error = validate_sql_request(data)
+        else:
+            query_text, error = validate_query_request(data)
+            sql_query = translate_query(query_text, database)[0] if not error else None
+        
+        if error:
+            return jsonify({
+                'success': False,
+                'error': error
+            }), 400
+        
+        try:
+            columns, batches = iter_query_batches(sql_query, current_app.config['EXPORT_BATCH_SIZE'], database)
+        except Exception as e:
+            return jsonify({
+                'success': False,
+                'sql_query': sql_query,
+                'error': str(e)
+            }), 400
+        
+        column_types = None
+        declared_types = None
+        
+        if export_format != 'csv':
+            if data.get('probe_types', current_app.config['EXPORT_TYPE_PROBE']):
+                # Every type SQLite actually stored, at the cost of running the query twice
+                column_types = probe_column_types(sql_query, columns, database)
+            else:
+                # Typed formats take the first batch's types, widened by what the schema declares
+                declared_types = declared_column_types(sql_query, columns, database)
+        
+        mimetype, extension = EXPORT_FORMATS[export_format]
+        chunks = stream_export(columns, batches, export_format, current_app.extensions.get('export_stats'),
+                               column_types, declared_types)
+        
+        return Response(stream_with_context(chunks), mimetype=mimetype, headers={
+            'Content-Disposition': f'attachment; filename=export.{extension}',
+            'X-SQL-Query': ' '.join(sql_query.split())
+        })
+        
+    except RequestEntityTooLarge:
+        raise
+        
+    except Exception as e:
+        logging.error(f"Error exporting results: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': f'Internal server error: {str(e)}'
+        }), 500
+
+@bp.route('/api/feedback', methods=['POST'])
+def submit_feedback():
+    """Correct the intent of a query and update the classifier incrementally"""
+    try:
+        # Corrections retrain the model every worker serves, so only token holders may send them
+        if not token_matches(current_app.config['FEEDBACK_TOKEN'], request.headers.get('X-Feedback-Token')):
+            return jsonify({
+                'success': False,
+                'error': 'Feedback token required'
+            }), 403
+        
+        data = request.get_json()
+        query_text, error = validate_query_request(data)
         
-        if not data or 'sql' not in data:
+        if error:
             return jsonify({
                 'success': False,
-                'error': 'SQL query is required'
+                'error': error
             }), 400
         
-        sql_query = data['sql'].strip()
+        intent = (data.get('intent') or '').strip()
         
-        if not sql_query:
+        if intent not in nlp_processor.intent_patterns:
             return jsonify({
                 'success': False,
-                'error': 'SQL query cannot be empty'
+                'error': f"Unknown intent '{intent}'. Expected one of: {', '.join(nlp_processor.intent_patterns)}"
             }), 400
         
-        # Basic SQL injection protection (very basic - implement proper sanitization)
-        dangerous_keywords = ['DROP', 'DELETE', 'UPDATE', 'INSERT', 'ALTER', 'CREATE']
-        sql_upper = sql_query.upper()
+        result = nlp_processor.learn(query_text, intent, current_app.config['FEEDBACK_WEIGHT'])
         
-        for keyword in dangerous_keywords:
-            if keyword in sql_upper:
-                return jsonify({
-                    'success': False,
-                    'error': f'Dangerous SQL operation detected: {keyword}. Only SELECT queries are allowed.'
-                }), 400
+        return jsonify({
+            'success': True,
+            'updated': result['updated'],
+            'model_version': result['model_version']
+        })
         
-        # Execute SQL query
-        query_result = execute_sql_query(sql_query)
+    except RequestEntityTooLarge:
+        raise
+        
+    except Exception as e:
+        logging.error(f"Error applying feedback: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': f'Internal server error: {str(e)}'
+        }), 500
+
+@bp.route('/api/history', methods=['GET'])
+def get_query_history():
+    """Get aggregated query history statistics"""
+    try:
+        limit = request.args.get('limit', 10, type=int)
+        hours = request.args.get('hours', type=float)
+        
+        history = current_app.extensions.get('query_history')
+        if history is not None:
+            # Give the writer a moment to persist recent records; only stored rows are read
+            history.wait(history.flush_interval)
+        
+        with db.engines['history'].connect() as connection:
+            stats = get_history_stats(connection, limit, hours)
         
         return jsonify({
             'success': True,
-            'sql_query': sql_query,
-            'results': query_result['data'],
-            'columns': query_result['columns'],
-            'row_count': query_result['row_count'],
-            'error': query_result['error']
+            'stats': stats,
+            'writer': history.stats() if history is not None else None
         })
         
     except Exception as e:
-        logging.error(f"Error executing SQL: {str(e)}")
+        logging.error(f"Error getting query history: {str(e)}")
         return jsonify({
             'success': False,
             'error': f'Internal server error: {str(e)}'
         }), 500
 
+@bp.route('/api/suggest', methods=['GET'])
+def suggest_queries():
+    """Suggest query completions for a typed prefix"""
+    try:
+        started = time.perf_counter()
+        prefix = request.args.get('prefix', '')
+        limit = min(request.args.get('limit', 8, type=int), 50)
+        
+        # Pick up new departments/projects/statuses and popular past queries (each rate limited)
+        schema_suggestions.refresh(db.session)
+        history_suggestions.refresh(db.engines['history'])
+        
+        suggestions = suggestion_index.suggest(prefix, limit)
+        
+        return jsonify({
+            'success': True,
+            'prefix': prefix,
+            'suggestions': suggestions,
+            'took_ms': round((time.perf_counter() - started) * 1000, 3)
+        })
+        
+    except Exception as e:
+        logging.error(f"Error suggesting queries: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': f'Internal server error: {str(e)}'
+        }), 500
+
+@bp.route('/api/databases', methods=['GET'])
+def list_databases():
+    """List the databases requests can target"""
+    registry = current_app.extensions.get('databases')
+    
+    return jsonify({
+        'success': True,
+        'default': DEFAULT_DATABASE,
+        'databases': [DEFAULT_DATABASE] + (registry.names() if registry is not None else []),
+        'registry': registry.stats() if registry is not None else None
+    })
+
 @bp.route('/api/examples', methods=['GET'])
 def get_query_examples():
     """Get example queries for users"""
-    examples = [
-        {
-            'text': 'Show all employees',
-            'description': 'Display all employees with their department information'
-        },
-        {
-            'text': 'How many employees work in IT?',
-            'description': 'Count employees in the IT department'
-        },
-        {
-            'text': 'Show employees with salary greater than 70000',
-            'description': 'Filter employees by salary threshold'
-        },
-        {
-            'text': 'What is the average salary?',
-            'description': 'Calculate average salary across all employees'
-        },
-        {
-            'text': 'List employees hired after 2020',
-            'description': 'Show recently hired employees'
-        },
-        {
-            'text': 'Show all projects',
-            'description': 'Display all projects in the database'
-        },
-        {
-            'text': 'Count employees in each department',
-            'description': 'Group employees by department'
-        },
-        {
-            'text': 'Show highest paid employee',
-            'description': 'Find the employee with maximum salary'
-        }
-    ]
-    
     return jsonify({
         'success': True,
-        'examples': examples
+        'examples': QUERY_EXAMPLES
     })
 
 @bp.errorhandler(404)
@@ -241,6 +685,13 @@ def not_found(error):
         'error': 'Endpoint not found'
     }), 404
 
+@bp.errorhandler(413)
+def request_too_large(error):
+    return jsonify({
+        'success': False,
+        'error': f"Request body exceeds the {current_app.config['MAX_CONTENT_LENGTH']} byte limit"
+    }), 413
+
 @bp.errorhandler(500)
 def internal_error(error):
     return jsonify({
@@ -0,0 +1,111 @@
+import re
+import logging
+
+# rowid = source id * ROWID_STRIDE + kind code, so triggers update one row by rowid
+ROWID_STRIDE = 4
+SEARCH_KINDS = {
+    'department': 1,
+    'project': 2,
+    'employee': 3
+}
+
+# Column weights for bm25(): kind and ref_id are unindexed, names outrank descriptions
+BM25_WEIGHTS = '0.0, 0.0, 10.0, 1.0'
+
+SEARCH_INDEX_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(
+        kind UNINDEXED, ref_id UNINDEXED, title, body,
+        tokenize = 'porter unicode61 remove_diacritics 2'
+    )""",
+]
+
+# Source tables indexed, as (kind, table, title SQL, body SQL) over NEW/OLD rows
+SEARCH_SOURCES = [
+    ('department', 'departments', "{row}.name", "coalesce({row}.description, '')"),
+    ('project', 'projects', "{row}.name", "coalesce({row}.description, '')"),
+    ('employee', 'employees', "{row}.first_name || ' ' || {row}.last_name", "''"),
+]
+
+def _rowid(kind, row):
+    return f"{row}.id * {ROWID_STRIDE} + {SEARCH_KINDS[kind]}"
+
+def _insert_sql(kind, title, body, row):
+    return (
+        f"INSERT INTO search_index(rowid, kind, ref_id, title, body) VALUES ("
+        f"{_rowid(kind, row)}, '{kind}', {row}.id, {title.format(row=row)}, {body.format(row=row)})"
+    )
+
+def search_index_statements():
+    """DDL for the FTS5 index and the triggers that keep it in step with its source tables"""
+    statements = list(SEARCH_INDEX_DDL)
+
+    for kind, table, title, body in SEARCH_SOURCES:
+        delete = f"DELETE FROM search_index WHERE rowid = {_rowid(kind, 'old')};"
+        statements.extend([
+            f"CREATE TRIGGER IF NOT EXISTS {table}_search_insert AFTER INSERT ON {table} BEGIN "
+            f"{_insert_sql(kind, title, body, 'new')}; END",
+            f"CREATE TRIGGER IF NOT EXISTS {table}_search_delete AFTER DELETE ON {table} BEGIN "
+            f"{delete} END",
+            f"CREATE TRIGGER IF NOT EXISTS {table}_search_update AFTER UPDATE ON {table} BEGIN "
+            f"{delete} {_insert_sql(kind, title, body, 'new')}; END",
+        ])
+
+    return statements
+
+def rebuild_statements():
+    """Statements that repopulate the index from its source tables"""
+    statements = ["DELETE FROM search_index"]
+    for kind, table, title, body in SEARCH_SOURCES:
+        statements.append(
+            f"INSERT INTO search_index(rowid, kind, ref_id, title, body) "
+            f"SELECT {_rowid(kind, table)}, '{kind}', id, {title.format(row=table)}, {body.format(row=table)} FROM {table}"
+        )
+    return statements
+
+def init_search_index(connection):
+    """Create the index and its triggers, filling the index on first creation
+
+    connection is a SQLAlchemy session or a sqlite3 connection; the caller
+    commits. Returns False if this SQLite build has no FTS5.
+    """
+    try:
+        existed = connection.execute("SELECT 1 FROM sqlite_master WHERE name = 'search_index'").fetchone() is not None
+        for statement in search_index_statements():
+            connection.execute(statement)
+        if not existed:
+            for statement in rebuild_statements():
+                connection.execute(statement)
+        return True
+    except Exception as e:
+        if 'fts5' not in str(e):
+            raise
+        logging.warning(f"Full-text search disabled: {str(e)}")
+        return False
+
+def match_expression(terms, column=None):
+    """FTS5 MATCH expression requiring every term, each as a prefix
+
+    Terms are reduced to word characters and quoted, so user input cannot
+    inject FTS5 query syntax or break out of the SQL string literal.
+    """
+    tokens = [token for term in terms for token in re.findall(r'\w+', term.lower())]
+    if not tokens:
+        return None
+
+    expression = ' '.join(f'"{token}"*' for token in tokens)
+    return f'{column} : ({expression})' if column else expression
+
+def build_search_sql(terms, kind=None, column=None, limit=50):
+    """Ranked full-text query over the index with highlighted snippets"""
+    conditions = [f"search_index MATCH '{match_expression(terms, column)}'"]
+
+    if kind:
+        conditions.append(f"kind = '{kind}'")
+
+    return (
+        "SELECT kind, ref_id, title, "
+        "snippet(search_index, -1, '<mark>', '</mark>', '...', 12) AS snippet, "
+        f"round(bm25(search_index, {BM25_WEIGHTS}), 3) AS score "
+        "FROM search_index WHERE " + ' AND '.join(conditions) + " "
+        f"ORDER BY bm25(search_index, {BM25_WEIGHTS}) LIMIT {int(limit)}"
+    )
@@ -15,6 +15,22 @@ class SpeechService:
             with sr.AudioFile(io.BytesIO(audio_data)) as source:
                 audio = self.recognizer.record(source)
             
+        except Exception as e:
+            return {
+                'success': False,
+                'text': None,
+                'error': f'Unexpected error: {str(e)}'
+            }
+        
+        return self.recognize(audio)
+    
+    def pcm_to_text(self, pcm_data, sample_rate, sample_width=2):
+        """Convert raw mono PCM samples to text using speech recognition"""
+        return self.recognize(sr.AudioData(pcm_data, sample_rate, sample_width))
+    
+    def recognize(self, audio):
+        """Run speech recognition on an AudioData instance"""
+        try:
             # Use Google's speech recognition
             text = self.recognizer.recognize_google(audio)
             return {
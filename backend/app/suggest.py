@@ -0,0 +1,251 @@
+import bisect
+import heapq
+import threading
+import time
+from sqlalchemy import text
+
+# Popularity a suggestion starts with, by where it came from
+SOURCE_WEIGHTS = {
+    'example': 5.0,
+    'pattern': 2.0,
+    'schema': 1.0,
+    'history': 0.0
+}
+
+# Prefixes this short match most of the index, so their top suggestions are kept ranked
+SHORT_PREFIX_LENGTH = 2
+
+class SuggestionIndex:
+    """Prefix index of query suggestions ranked by popularity
+
+    Every phrase is indexed under each of its word starts in one sorted
+    list, so the keys matching a prefix are one contiguous range found by
+    two bisects. Entries can be added, removed and bumped without
+    rebuilding the index.
+
+    Prefixes of up to SHORT_PREFIX_LENGTH characters match most phrases,
+    so each keeps its best top_k phrases in rank order. The list is built
+    on first use, and adds and bumps keep it current: popularity only
+    rises, so an entry outside the list only has to beat its last phrase.
+    A removal drops the lists holding the phrase, to be rebuilt on demand.
+    """
+
+    def __init__(self, top_k=50):
+        self.top_k = top_k
+        self._keys = []
+        self._entries = {}
+        self._top = {}
+        self._lock = threading.Lock()
+
+    def _index_keys(self, phrase):
+        words = phrase.split()
+        return [(' '.join(words[i:]), phrase) for i in range(len(words))]
+
+    def _rank(self, phrase, prefix):
+        """Sort key for a phrase matching prefix: whole-phrase matches, popularity, length, then text"""
+        whole = 2 if phrase.startswith(prefix) else 1
+        return (-whole, -self._entries[phrase]['popularity'], len(phrase), phrase)
+
+    def _short_prefixes(self, phrase):
+        """Short prefixes under which a phrase is suggested"""
+        return {
+            key[:length]
+            for key, _ in self._index_keys(phrase)
+            for length in range(1, SHORT_PREFIX_LENGTH + 1)
+            if len(key) >= length and not key[:length].endswith(' ')
+        }
+
+    def _promote(self, phrase):
+        """Move a new or more popular phrase into the top lists it now belongs to"""
+        for prefix in self._short_prefixes(phrase):
+            top = self._top.get(prefix)
+            if top is None:
+                continue
+
+            rank = self._rank(phrase, prefix)
+            if phrase not in top:
+                # A full list only admits a phrase that beats its last one
+                if len(top) >= self.top_k and rank >= self._rank(top[-1], prefix):
+                    continue
+                top.append(phrase)
+
+            top.sort(key=lambda candidate: self._rank(candidate, prefix))
+            del top[self.top_k:]
+
+    def _scan(self, prefix, limit):
+        """Rank every phrase with a key starting with prefix"""
+        # Every key starting with prefix sorts between prefix and prefix + the largest code point
+        start = bisect.bisect_left(self._keys, (prefix,))
+        end = bisect.bisect_left(self._keys, (prefix + '\U0010ffff',), start)
+        phrases = {phrase for _, phrase in self._keys[start:end]}
+        return heapq.nsmallest(limit, phrases, key=lambda phrase: self._rank(phrase, prefix))
+
+    def add(self, text, source, popularity=None):
+        """Add a suggestion, or raise the popularity of an existing one"""
+        phrase = ' '.join(text.lower().split())
+        if not phrase:
+            return
+
+        weight = SOURCE_WEIGHTS.get(source, 0.0) if popularity is None else popularity
+        with self._lock:
+            entry = self._entries.get(phrase)
+            if entry is not None:
+                entry['sources'].add(source)
+                if weight > entry['popularity']:
+                    entry['popularity'] = weight
+                    self._promote(phrase)
+                return
+
+            self._entries[phrase] = {'text': text.strip(), 'popularity': weight, 'sources': {source}}
+            for key in self._index_keys(phrase):
+                bisect.insort(self._keys, key)
+            self._promote(phrase)
+
+    def remove(self, text, source):
+        """Drop a source from a suggestion, removing it once no source is left"""
+        phrase = ' '.join(text.lower().split())
+        with self._lock:
+            entry = self._entries.get(phrase)
+            if entry is None:
+                return
+
+            entry['sources'].discard(source)
+            if entry['sources']:
+                return
+
+            for prefix in self._short_prefixes(phrase):
+                if phrase in self._top.get(prefix, ()):
+                    del self._top[prefix]
+
+            del self._entries[phrase]
+            for key in self._index_keys(phrase):
+                position = bisect.bisect_left(self._keys, key)
+                if position < len(self._keys) and self._keys[position] == key:
+                    del self._keys[position]
+
+    def bump(self, text, amount=1.0):
+        """Count a use of a suggestion that is already indexed"""
+        phrase = ' '.join(text.lower().split())
+        with self._lock:
+            entry = self._entries.get(phrase)
+            if entry is not None and amount > 0:
+                entry['popularity'] += amount
+                self._promote(phrase)
+
+    def suggest(self, prefix, limit=8):
+        """Most popular suggestions whose phrase, or one of its words onward, starts with prefix"""
+        prefix = ' '.join(prefix.lower().split())
+        if not prefix:
+            return []
+
+        with self._lock:
+            if len(prefix) <= SHORT_PREFIX_LENGTH and limit <= self.top_k:
+                top = self._top.get(prefix)
+                if top is None:
+                    top = self._top[prefix] = self._scan(prefix, self.top_k)
+                ranked = top[:limit]
+            else:
+                ranked = self._scan(prefix, limit)
+
+            return [
+                {'text': self._entries[phrase]['text'], 'source': sorted(self._entries[phrase]['sources'])[0]}
+                for phrase in ranked
+            ]
+
+    def __len__(self):
+        return len(self._entries)
+
+def schema_suggestions(departments, projects, statuses):
+    """Suggestion phrases built from live database values"""
+    phrases = []
+    for name in departments:
+        phrases.append(f'Show employees in {name} department')
+        phrases.append(f'How many employees work in {name}')
+        phrases.append(f'Average salary in {name}')
+    for name in projects:
+        phrases.append(f'Show project {name}')
+    for status in statuses:
+        phrases.append(f'Show {status} projects')
+    return phrases
+
+class SchemaSuggestions:
+    """Keeps schema-derived suggestions in step with the database"""
+
+    def __init__(self, index, refresh_interval=30.0):
+        self.index = index
+        self.refresh_interval = refresh_interval
+        self._phrases = set()
+        self._fingerprint = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+
+    def refresh(self, session, force=False):
+        """Re-read schema values if they changed, applying only the difference"""
+        now = time.monotonic()
+        if not force and now - self._last_check < self.refresh_interval:
+            return False
+        if not self._lock.acquire(blocking=False):
+            return False
+
+        try:
+            self._last_check = now
+            # The value columns are small, so the values themselves are the fingerprint
+            fingerprint = tuple(session.execute(text(
+                "SELECT (SELECT group_concat(name, char(31)) FROM departments), "
+                "(SELECT group_concat(name, char(31)) FROM projects), "
+                "(SELECT group_concat(DISTINCT status) FROM projects WHERE status IS NOT NULL)"
+            )).fetchone())
+            if fingerprint == self._fingerprint:
+                return False
+
+            departments = fingerprint[0].split('\x1f') if fingerprint[0] else []
+            projects = fingerprint[1].split('\x1f') if fingerprint[1] else []
+            statuses = fingerprint[2].split(',') if fingerprint[2] else []
+            phrases = set(schema_suggestions(departments, projects, statuses))
+
+            for phrase in self._phrases - phrases:
+                self.index.remove(phrase, 'schema')
+            for phrase in phrases - self._phrases:
+                self.index.add(phrase, 'schema')
+
+            self._phrases = phrases
+            self._fingerprint = fingerprint
+            return True
+        finally:
+            self._lock.release()
+
+class HistorySuggestions:
+    """Reloads suggestion popularity from query history on its own interval"""
+
+    def __init__(self, index, refresh_interval=30.0, limit=200):
+        self.index = index
+        self.refresh_interval = refresh_interval
+        self.limit = limit
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+
+    def refresh(self, engine, force=False):
+        """Re-read the most frequent past queries once the interval has passed"""
+        now = time.monotonic()
+        if not force and now - self._last_check < self.refresh_interval:
+            return False
+        if not self._lock.acquire(blocking=False):
+            return False
+
+        try:
+            self._last_check = now
+            with engine.connect() as connection:
+                load_history_popularity(self.index, connection, self.limit)
+            return True
+        finally:
+            self._lock.release()
+
+def load_history_popularity(index, connection, limit=200):
+    """Seed popularity from the most frequent past queries"""
+    rows = connection.execute(text(
+        "SELECT normalized_query, COUNT(*) AS count FROM query_history "
+        "WHERE success = 1 GROUP BY normalized_query ORDER BY count DESC LIMIT :limit"
+    ), {'limit': limit}).fetchall()
+
+    for normalized_query, count in rows:
+        index.add(normalized_query, 'history', popularity=float(count))
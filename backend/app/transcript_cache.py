@@ -0,0 +1,136 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+class TranscriptCache:
+    """Two-tier cache of speech transcripts keyed by normalized audio samples"""
+
+    def __init__(self, max_entries=256, db_path=None, ttl=86400):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.db_path = db_path
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS transcripts ("
+                "key TEXT PRIMARY KEY, text TEXT NOT NULL, "
+                "recognition_time REAL NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    def key(self, pcm_data, sample_rate):
+        """Content hash of the normalized PCM samples"""
+        digest = hashlib.sha256()
+        digest.update(str(sample_rate).encode())
+        digest.update(pcm_data)
+        return digest.hexdigest()
+
+    def get(self, key):
+        """Look up a transcript in memory, then on disk"""
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if now - entry['created_at'] <= self.ttl:
+                    self._entries.move_to_end(key)
+                    self.memory_hits += 1
+                    self.saved_seconds += entry['recognition_time']
+                    return entry
+                del self._entries[key]
+
+            if self._db is None:
+                return None
+
+            row = self._db.execute(
+                "SELECT text, recognition_time, created_at FROM transcripts WHERE key = ? AND created_at >= ?",
+                (key, now - self.ttl)
+            ).fetchone()
+            if row is None:
+                return None
+
+            entry = {'text': row[0], 'recognition_time': row[1], 'created_at': row[2]}
+            self._remember(key, entry)
+            self.disk_hits += 1
+            self.saved_seconds += entry['recognition_time']
+            return entry
+
+    def put(self, key, text, recognition_time):
+        """Store a transcript in both tiers"""
+        entry = {'text': text, 'recognition_time': recognition_time, 'created_at': time.time()}
+
+        with self._lock:
+            self._remember(key, entry)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO transcripts (key, text, recognition_time, created_at) VALUES (?, ?, ?, ?)",
+                    (key, text, recognition_time, entry['created_at'])
+                )
+                self._db.execute("DELETE FROM transcripts WHERE created_at < ?", (entry['created_at'] - self.ttl,))
+                self._db.commit()
+
+    def _remember(self, key, entry):
+        """Insert into the memory tier, evicting the least recently used entry"""
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def recognize(self, pcm_data, sample_rate, recognize):
+        """Return a cached transcript or call recognize() and cache its result"""
+        key = self.key(pcm_data, sample_rate)
+        entry = self.get(key)
+
+        if entry is not None:
+            return {
+                'success': True,
+                'text': entry['text'],
+                'cached': True,
+                'error': None
+            }
+
+        with self._lock:
+            self.misses += 1
+
+        started = time.perf_counter()
+        result = recognize()
+        elapsed = time.perf_counter() - started
+
+        # Only successful transcripts are cached; failures may be transient
+        if result['success']:
+            self.put(key, result['text'], elapsed)
+
+        return dict(result, cached=False)
+
+    def stats(self):
+        """Hit rate and recognition time saved by the cache"""
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': round(hits / lookups, 4) if lookups else 0.0,
+                'saved_seconds': round(self.saved_seconds, 3)
+            }
+
+    def close(self):
+        """Close the on-disk tier"""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -0,0 +1,74 @@
+"""Compare JSON encoders and response compression on large query results.
+
+Builds rows shaped like the employees/departments join, then reports encode
+time for Flask's stdlib-based provider and the fast provider, and bytes on
+the wire (plus compression time) for each supported content coding.
+
+    python benchmarks/json_benchmark.py --rows 50000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import date, datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.responses import encode_json, compress, available_encodings
+
+DEPARTMENTS = ['IT', 'HR', 'Engineering', 'Marketing', 'Finance']
+
+def make_rows(count):
+    random.seed(0)
+    rows = []
+    for i in range(count):
+        department_id = random.randrange(len(DEPARTMENTS))
+        rows.append({
+            'id': i + 1,
+            'first_name': f'First{i % 500}',
+            'last_name': f'Last{i % 700}',
+            'email': f'user{i}@company.com',
+            'department_id': department_id + 1,
+            'salary': round(random.uniform(40000, 150000), 2),
+            'hire_date': date(2015 + i % 9, 1 + i % 12, 1 + i % 28),
+            'created_at': datetime(2023, 1, 1, 12, 0, 0),
+            'name': DEPARTMENTS[department_id],
+            'description': f'{DEPARTMENTS[department_id]} Department',
+            'manager_id': None
+        })
+    return rows
+
+def timed(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+    return result, best * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    payload = {'success': True, 'results': make_rows(args.rows), 'row_count': args.rows}
+
+    # Flask's DefaultJSONProvider: stdlib encoder, sorted keys, compact separators
+    stdlib_body, stdlib_ms = timed(
+        lambda: json.dumps(payload, default=str, sort_keys=True, separators=(',', ':')).encode(), args.repeat)
+    fast_body, fast_ms = timed(lambda: encode_json(payload), args.repeat)
+
+    print(f'rows: {args.rows}')
+    print(f'encode stdlib: {stdlib_ms:8.1f} ms  {len(stdlib_body):>10} bytes')
+    print(f'encode fast:   {fast_ms:8.1f} ms  {len(fast_body):>10} bytes  ({stdlib_ms / fast_ms:.1f}x)')
+
+    for encoding in available_encodings():
+        compressed, compress_ms = timed(lambda: compress(fast_body, encoding), args.repeat)
+        ratio = len(fast_body) / len(compressed)
+        print(f'{encoding:<5} wire:    {compress_ms:8.1f} ms  {len(compressed):>10} bytes  ({ratio:.1f}x smaller)')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,165 @@
+"""Compare serving modes under mixed load.
+
+Modes: sync (Flask dev server), gunicorn (threaded sync workers), asgi
+(uvicorn) and gunicorn-asgi (gunicorn managing uvicorn workers).
+
+Starts each server on its own port, sends a mix of /api/query and /api/voice
+requests from a pool of client threads, and reports requests per second and
+latency percentiles.
+
+    python benchmarks/load_test.py --requests 2000 --concurrency 32 --voice-ratio 0.1
+"""
+import argparse
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+import uuid
+import wave
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+QUERIES = [
+    'Show all employees',
+    'How many employees work in IT?',
+    'Show employees with salary greater than 70000',
+    'What is the average salary?',
+    'List employees hired after 2020',
+    'Show all projects',
+    'Count employees in each department'
+]
+
+def synthetic_wav(seconds=2.0, sample_rate=44100):
+    """A stereo WAV with a tone between stretches of silence"""
+    t = np.arange(int(sample_rate * seconds)) / sample_rate
+    signal = np.where((t > seconds / 4) & (t < 3 * seconds / 4), 0.4 * np.sin(2 * np.pi * 300 * t), 0.0)
+    pcm = (np.repeat(signal[:, None], 2, axis=1) * 32767).astype('<i2').tobytes()
+
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav:
+        wav.setnchannels(2)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm)
+    return buffer.getvalue()
+
+def query_request(base_url):
+    body = json.dumps({'query': random.choice(QUERIES)}).encode()
+    return urllib.request.Request(base_url + '/api/query', data=body,
+                                  headers={'Content-Type': 'application/json'})
+
+def voice_request(base_url, audio):
+    boundary = uuid.uuid4().hex
+    body = (
+        f'--{boundary}\r\n'
+        'Content-Disposition: form-data; name="audio"; filename="audio.wav"\r\n'
+        'Content-Type: audio/wav\r\n\r\n'
+    ).encode() + audio + f'\r\n--{boundary}--\r\n'.encode()
+    return urllib.request.Request(base_url + '/api/voice', data=body,
+                                  headers={'Content-Type': f'multipart/form-data; boundary={boundary}'})
+
+def send(request):
+    """Send one request, returning (kind, latency, status)"""
+    kind = 'voice' if request.full_url.endswith('/api/voice') else 'query'
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=60) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except Exception:
+        status = None
+    return kind, time.perf_counter() - started, status
+
+def wait_until_healthy(base_url, timeout=120):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(base_url + '/api/health', timeout=2):
+                return
+        except Exception:
+            time.sleep(0.5)
+    raise RuntimeError(f'Server at {base_url} did not become healthy')
+
+def start_server(mode, port):
+    env = dict(os.environ, PORT=str(port), FLASK_DEBUG='false')
+    bind = ['--bind', f'127.0.0.1:{port}', '--log-level', 'warning']
+    if mode == 'sync':
+        command = [sys.executable, 'run.py']
+    elif mode == 'gunicorn':
+        command = [sys.executable, '-m', 'gunicorn', '--threads', '16', *bind, 'run:app']
+    elif mode == 'gunicorn-asgi':
+        command = [sys.executable, '-m', 'gunicorn', '-k', 'uvicorn.workers.UvicornWorker', *bind, 'asgi:app']
+    else:
+        command = [sys.executable, '-m', 'uvicorn', 'asgi:app', '--port', str(port), '--log-level', 'warning']
+    return subprocess.Popen(command, cwd=BACKEND_DIR, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+def percentile(values, pct):
+    return float(np.percentile(values, pct)) * 1000 if values else 0.0
+
+def run_load(base_url, total, concurrency, voice_ratio, audio):
+    requests = [
+        voice_request(base_url, audio) if random.random() < voice_ratio else query_request(base_url)
+        for _ in range(total)
+    ]
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        results = list(pool.map(send, requests))
+    elapsed = time.perf_counter() - started
+
+    latencies = [latency for _, latency, _ in results]
+    report = {
+        'requests': total,
+        'seconds': round(elapsed, 3),
+        'rps': round(total / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 50), 1),
+        'p99_ms': round(percentile(latencies, 99), 1),
+        'failed': sum(1 for _, _, status in results if status is None or status >= 500)
+    }
+    for kind in ('query', 'voice'):
+        kind_latencies = [latency for k, latency, _ in results if k == kind]
+        report[f'{kind}_count'] = len(kind_latencies)
+        report[f'{kind}_p99_ms'] = round(percentile(kind_latencies, 99), 1)
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--modes', default='sync,asgi', help='comma-separated: sync, gunicorn, asgi, gunicorn-asgi')
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--voice-ratio', type=float, default=0.1)
+    parser.add_argument('--voice-file', help='WAV recording to send instead of a synthetic tone')
+    parser.add_argument('--port', type=int, default=5100)
+    args = parser.parse_args()
+
+    audio = open(args.voice_file, 'rb').read() if args.voice_file else synthetic_wav()
+
+    for offset, mode in enumerate(args.modes.split(',')):
+        port = args.port + offset
+        server = start_server(mode, port)
+        try:
+            base_url = f'http://127.0.0.1:{port}'
+            wait_until_healthy(base_url)
+            # Warm up model and connections before measuring
+            run_load(base_url, 20, 4, 0.0, audio)
+            # Same request mix for every mode
+            random.seed(0)
+            report = run_load(base_url, args.requests, args.concurrency, args.voice_ratio, audio)
+            print(json.dumps(dict(mode=mode, **report)))
+        finally:
+            server.terminate()
+            server.wait()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""Show admission control keeping latency bounded when the server is overloaded.
+
+Runs the ASGI server with admission control off and then on, and floods it
+with a mix of cheap /api/query lookups, slow /api/sql scans and /api/voice
+uploads from more client threads than the server has slots. It reports, per
+endpoint class, how many requests were served or shed (429/503) and the
+p50/p99 latency of the served ones.
+
+    python benchmarks/overload_test.py --requests 3000 --concurrency 128
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from load_test import BACKEND_DIR, percentile, query_request, synthetic_wav, voice_request, wait_until_healthy
+
+# A read-only scan that keeps SQLite busy for a while
+SLOW_SQL = (
+    'WITH RECURSIVE n(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM n WHERE x < 2000000) '
+    'SELECT COUNT(*) AS rows_scanned FROM n'
+)
+
+def sql_request(base_url):
+    body = json.dumps({'sql': SLOW_SQL}).encode()
+    return urllib.request.Request(base_url + '/api/sql', data=body,
+                                  headers={'Content-Type': 'application/json'})
+
+def send(request):
+    """Send one request, returning (kind, latency, status)"""
+    kind = request.full_url.rsplit('/', 1)[-1]
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=120) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except Exception:
+        status = None
+    return kind, time.perf_counter() - started, status
+
+def start_server(port, admission):
+    env = dict(os.environ, ADMISSION_CONTROL=str(admission), COALESCE_REQUESTS='False')
+    command = [sys.executable, '-m', 'uvicorn', 'asgi:app', '--port', str(port), '--log-level', 'warning']
+    return subprocess.Popen(command, cwd=BACKEND_DIR, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+def run_overload(base_url, total, concurrency, sql_ratio, voice_ratio, audio):
+    requests = []
+    for _ in range(total):
+        draw = random.random()
+        if draw < sql_ratio:
+            requests.append(sql_request(base_url))
+        elif draw < sql_ratio + voice_ratio:
+            requests.append(voice_request(base_url, audio))
+        else:
+            requests.append(query_request(base_url))
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        results = list(pool.map(send, requests))
+    elapsed = time.perf_counter() - started
+
+    report = {'requests': total, 'seconds': round(elapsed, 3)}
+    for kind in ('query', 'sql', 'voice'):
+        served = [latency for k, latency, status in results if k == kind and status is not None and status < 429]
+        report[kind] = {
+            'served': len(served),
+            'shed': sum(1 for k, _, status in results if k == kind and status in (429, 503)),
+            'failed': sum(1 for k, _, status in results if k == kind and (status is None or status >= 500 and status != 503)),
+            'p50_ms': round(percentile(served, 50), 1),
+            'p99_ms': round(percentile(served, 99), 1)
+        }
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=128)
+    parser.add_argument('--sql-ratio', type=float, default=0.1)
+    parser.add_argument('--voice-ratio', type=float, default=0.1)
+    parser.add_argument('--port', type=int, default=5200)
+    args = parser.parse_args()
+
+    audio = synthetic_wav()
+
+    for offset, admission in enumerate((False, True)):
+        port = args.port + offset
+        server = start_server(port, admission)
+        try:
+            base_url = f'http://127.0.0.1:{port}'
+            wait_until_healthy(base_url)
+            # Same request mix for both runs
+            random.seed(0)
+            report = run_overload(base_url, args.requests, args.concurrency, args.sql_ratio, args.voice_ratio, audio)
+            print(json.dumps(dict(admission_control=admission, **report)))
+        finally:
+            server.terminate()
+            server.wait()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""Compare the FTS5 search index against LIKE scans on a large generated dataset.
+
+Generates departments, projects and employees with random names and
+descriptions in a temporary SQLite file, builds the search index with the
+same DDL and triggers the app uses, then times the ranked top-50 MATCH
+queries the app runs against LIKE '%term%' scans over the source columns.
+LIKE cannot rank, so a LIKE-based search has to collect every match before
+it can order them; the scans here do just that, without the ordering.
+
+    python benchmarks/search_benchmark.py --projects 200000 --employees 200000
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.search import build_search_sql, init_search_index
+
+TOPICS = ['analytics', 'mobile', 'billing', 'security', 'migration', 'reporting', 'compliance', 'onboarding']
+LAST_NAMES = ['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Wilson', 'Moore']
+
+def word(rng):
+    return ''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(rng.randint(4, 9)))
+
+def generate(connection, departments, projects, employees, seed=0):
+    """Fill the source tables, returning the filler vocabulary"""
+    rng = random.Random(seed)
+    filler = [word(rng) for _ in range(5000)]
+
+    def sentence(length):
+        words = rng.sample(filler, length)
+        # Roughly one topic word per ten rows
+        if rng.random() < 0.1:
+            words[rng.randrange(length)] = rng.choice(TOPICS)
+        return ' '.join(words)
+
+    connection.executescript("""
+        CREATE TABLE departments (id INTEGER PRIMARY KEY, name TEXT, description TEXT);
+        CREATE TABLE projects (id INTEGER PRIMARY KEY, name TEXT, description TEXT);
+        CREATE TABLE employees (id INTEGER PRIMARY KEY, first_name TEXT, last_name TEXT);
+    """)
+    connection.executemany("INSERT INTO departments VALUES (?, ?, ?)",
+                           ((i, sentence(2).title(), sentence(12)) for i in range(1, departments + 1)))
+    connection.executemany("INSERT INTO projects VALUES (?, ?, ?)",
+                           ((i, sentence(3).title(), sentence(25)) for i in range(1, projects + 1)))
+    connection.executemany("INSERT INTO employees VALUES (?, ?, ?)",
+                           ((i, word(rng).title(), rng.choice(LAST_NAMES + [word(rng).title()] * 40))
+                            for i in range(1, employees + 1)))
+    connection.commit()
+    return filler
+
+def like_sql(term, kind=None, names_only=False):
+    """The LIKE scans a search would otherwise need"""
+    pattern = f"'%{term}%'"
+    scans = {
+        'department': f"SELECT 'department', id, name FROM departments WHERE name LIKE {pattern}"
+                      + ('' if names_only else f" OR description LIKE {pattern}"),
+        'project': f"SELECT 'project', id, name FROM projects WHERE name LIKE {pattern}"
+                   + ('' if names_only else f" OR description LIKE {pattern}"),
+        'employee': f"SELECT 'employee', id, first_name || ' ' || last_name FROM employees "
+                    f"WHERE first_name || ' ' || last_name LIKE {pattern}"
+    }
+    selected = [scans[kind]] if kind else list(scans.values())
+    return ' UNION ALL '.join(selected)
+
+def time_query(connection, sql, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rows = connection.execute(sql).fetchall()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000, len(rows)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--departments', type=int, default=1000)
+    parser.add_argument('--projects', type=int, default=200000)
+    parser.add_argument('--employees', type=int, default=200000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        connection = sqlite3.connect(os.path.join(tmp, 'search.db'))
+        filler = generate(connection, args.departments, args.projects, args.employees)
+
+        started = time.perf_counter()
+        init_search_index(connection)
+        connection.commit()
+        print(json.dumps({'index_build_s': round(time.perf_counter() - started, 3)}))
+
+        cases = [
+            ('projects about analytics', ['analytics'], 'project', None),
+            ('anything mentioning security', ['security'], None, None),
+            ('employees named smith', ['smith'], 'employee', 'title'),
+            ('projects about mobile billing', ['mobile', 'billing'], 'project', None),
+            # A filler word matches about half a percent of rows
+            (f'anything about {filler[0]}', [filler[0]], None, None),
+        ]
+        for label, terms, kind, column in cases:
+            fts_ms, fts_rows = time_query(connection, build_search_sql(terms, kind, column), args.repeat)
+            # Only the first term: a best case for LIKE, which has no AND-of-terms matching
+            like_ms, like_rows = time_query(connection, like_sql(terms[0], kind, column == 'title'), args.repeat)
+            print(json.dumps({
+                'query': label,
+                'fts_ms': round(fts_ms, 2),
+                'fts_rows': fts_rows,
+                'like_ms': round(like_ms, 2),
+                'like_rows': like_rows,
+                'speedup': round(like_ms / fts_ms, 1) if fts_ms else None
+            }))
+
+        connection.close()
+
+if __name__ == '__main__':
+    main()
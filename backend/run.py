@@ -16,6 +16,11 @@ if __name__ == '__main__':
     print("- GET /api/schema - Get database schema")
     print("- POST /api/sql - Execute direct SQL queries")
     print("- GET /api/examples - Get example queries")
+    print("- GET /api/databases - List queryable databases")
+    print("- GET /api/suggest?prefix= - Autocomplete query suggestions")
+    print("- POST /api/export - Stream query results as CSV, Parquet or Arrow")
+    print("- POST /api/feedback - Correct a query's intent")
+    print("- GET /api/history - Get query history statistics")
     print("- GET /api/health - Health check")
     
     app.run(host='0.0.0.0', port=port, debug=debug)
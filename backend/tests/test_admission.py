@@ -0,0 +1,122 @@
+import unittest
+import json
+import os
+import threading
+import time
+from unittest import mock
+from app import create_app
+from app.admission import AdmissionController, Rejected, classify, parse_budgets
+
+class AdmissionControllerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.controller = AdmissionController(parse_budgets('query=1:2:1,voice=1:1:0.05'), max_concurrency=2)
+
+    def test_classify(self):
+        """Test paths map to endpoint classes and health checks bypass admission"""
+        self.assertEqual(classify('POST', '/api/voice'), 'voice')
+        self.assertEqual(classify('POST', '/api/export'), 'sql')
+        self.assertEqual(classify('GET', '/api/suggest'), 'query')
+        self.assertEqual(classify('POST', '/api/feedback'), 'heavy')
+        self.assertEqual(classify('GET', '/api/history'), 'heavy')
+        self.assertIsNone(classify('GET', '/api/health'))
+        self.assertIsNone(classify('OPTIONS', '/api/query'))
+
+    def test_unbudgeted_class_uses_lowest_priority(self):
+        """Test a class missing from the budgets shares the last class's budget"""
+        ticket = self.controller.acquire('heavy')
+        self.assertEqual(ticket.endpoint_class.name, 'voice')
+        self.controller.release(ticket)
+
+    def test_queue_full_is_rejected_immediately(self):
+        """Test a full queue sheds with 429 and a Retry-After estimate"""
+        held = self.controller.acquire('voice')
+        queued = self.controller.request('voice')
+        self.assertFalse(queued.granted)
+
+        with self.assertRaises(Rejected) as context:
+            self.controller.request('voice')
+        self.assertEqual(context.exception.status, 429)
+        self.assertGreaterEqual(context.exception.retry_after, 1)
+
+        self.controller.release(held)
+        self.assertTrue(queued.granted)
+        self.assertEqual(self.controller.stats()['classes']['voice']['shed_queue_full'], 1)
+
+    def test_deadline_sheds_with_503(self):
+        """Test a queued request is shed once its class deadline passes"""
+        self.controller.acquire('voice')
+        with self.assertRaises(Rejected) as context:
+            self.controller.acquire('voice')
+        self.assertEqual(context.exception.status, 503)
+
+        stats = self.controller.stats()['classes']['voice']
+        self.assertEqual((stats['queue_depth'], stats['shed_timeout']), (0, 1))
+
+    def test_cheap_requests_take_freed_slots_first(self):
+        """Test a freed process-wide slot goes to the highest priority queue"""
+        first = self.controller.acquire('query')
+        self.controller.acquire('voice')
+        voice = self.controller.request('voice')
+        query = self.controller.request('query')
+
+        self.controller.release(first)
+        self.assertTrue(query.granted)
+        self.assertFalse(voice.granted)
+
+    def test_waiting_request_is_woken(self):
+        """Test a blocked acquire returns once a slot is released"""
+        held = self.controller.acquire('query')
+        admitted = []
+        waiter = threading.Thread(target=lambda: admitted.append(self.controller.acquire('query')))
+        waiter.start()
+
+        while not self.controller.stats()['classes']['query']['queue_depth']:
+            time.sleep(0.001)
+        self.controller.release(held)
+        waiter.join()
+        self.assertTrue(admitted[0].granted)
+
+class AdmissionAPITestCase(unittest.TestCase):
+
+    def setUp(self):
+        with mock.patch.dict(os.environ, {'ADMISSION_BUDGETS': 'query=4:8:1,sql=1:0:1,voice=1:1:1,heavy=1:0:1'}):
+            self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+        self.admission = self.app.extensions['admission']
+
+    def test_overloaded_class_is_shed(self):
+        """Test a saturated class rejects with Retry-After while other classes still run"""
+        held = self.admission.acquire('sql')
+        try:
+            response = self.client.post('/api/sql', data=json.dumps({'sql': 'SELECT 1'}),
+                                        content_type='application/json')
+            self.assertEqual(response.status_code, 429)
+            self.assertIn('Retry-After', response.headers)
+
+            response = self.client.post('/api/query', data=json.dumps({'query': 'Show all projects'}),
+                                        content_type='application/json')
+            self.assertEqual(response.status_code, 200)
+        finally:
+            self.admission.release(held)
+
+        health = json.loads(self.client.get('/api/health').data)
+        self.assertEqual(health['admission']['active'], 0)
+        self.assertEqual(health['admission']['classes']['sql']['shed_queue_full'], 1)
+        self.assertEqual(health['admission']['classes']['query']['admitted'], 1)
+
+    def test_heavy_endpoints_do_not_use_query_slots(self):
+        """Test feedback and history are shed on their own budget while queries run"""
+        held = self.admission.acquire('heavy')
+        try:
+            self.assertEqual(self.client.get('/api/history').status_code, 429)
+            response = self.client.post('/api/feedback', data=json.dumps({'query': 'payroll', 'intent': 'count'}),
+                                        content_type='application/json')
+            self.assertEqual(response.status_code, 429)
+            self.assertEqual(self.client.get('/api/suggest?prefix=show').status_code, 200)
+        finally:
+            self.admission.release(held)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+import unittest
+import asyncio
+import json
+import os
+import threading
+import time
+from unittest import mock
+from app import create_app
+from app.asgi import AsgiApp
+
+def call(asgi_app, method, path, body=b'', headers=()):
+    """Drive a single HTTP request through an ASGI app"""
+    messages = []
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+        'method': method, 'scheme': 'http', 'path': path, 'raw_path': path.encode(),
+        'query_string': b'', 'root_path': '', 'server': ('testserver', 80),
+        'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())] + list(headers)
+    }
+
+    async def receive():
+        return {'type': 'http.request', 'body': body, 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(asgi_app(scope, receive, send))
+
+    status = messages[0]['status']
+    payload = b''.join(m.get('body', b'') for m in messages[1:])
+    return status, json.loads(payload)
+
+class AsgiAppTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.asgi_app = AsgiApp(create_app())
+
+    def tearDown(self):
+        self.asgi_app.nlp_executor.shutdown()
+        self.asgi_app.db_executor.shutdown()
+        self.asgi_app.wsgi_executor.shutdown()
+        self.asgi_app.admission_executor.shutdown()
+
+    def test_async_query_handler(self):
+        """Test /api/query is served by the async handler"""
+        status, data = call(self.asgi_app, 'POST', '/api/query', json.dumps({'query': 'Show all employees'}).encode())
+        self.assertEqual(status, 200)
+        self.assertTrue(data['success'])
+        self.assertGreater(data['row_count'], 0)
+
+    def test_model_reload_off_event_loop(self):
+        """Test the between-request model reload runs on the NLP pool, not the event loop thread"""
+        threads = []
+        with mock.patch('app.routes.nlp_processor.maybe_reload',
+                        side_effect=lambda: threads.append(threading.current_thread().name)):
+            status, _ = call(self.asgi_app, 'POST', '/api/query', json.dumps({'query': 'Show all projects'}).encode())
+
+        self.assertEqual(status, 200)
+        self.assertTrue(threads)
+        self.assertNotIn(threading.current_thread().name, threads)
+
+    def test_async_sql_validation(self):
+        """Test /api/sql rejects writes in the async handler"""
+        status, data = call(self.asgi_app, 'POST', '/api/sql', json.dumps({'sql': 'DELETE FROM employees'}).encode())
+        self.assertEqual(status, 400)
+        self.assertFalse(data['success'])
+
+    def test_fallback_to_flask(self):
+        """Test other endpoints fall through to the Flask app"""
+        status, data = call(self.asgi_app, 'GET', '/api/examples')
+        self.assertEqual(status, 200)
+        self.assertIn('examples', data)
+
+    def test_fallback_requests_run_concurrently(self):
+        """Test slow Flask endpoints are not serialized onto one thread"""
+        flask_app = self.asgi_app.flask_app
+        flask_app.add_url_rule('/api/slow', 'slow', lambda: (time.sleep(0.3), {'success': True})[1])
+
+        async def five_at_once():
+            scope = {
+                'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+                'method': 'GET', 'scheme': 'http', 'path': '/api/slow', 'raw_path': b'/api/slow',
+                'query_string': b'', 'root_path': '', 'server': ('testserver', 80), 'headers': []
+            }
+            statuses = []
+
+            async def receive():
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    statuses.append(message['status'])
+
+            await asyncio.gather(*(self.asgi_app(dict(scope), receive, send) for _ in range(5)))
+            return statuses
+
+        started = time.perf_counter()
+        statuses = asyncio.run(five_at_once())
+        self.assertEqual(statuses, [200] * 5)
+        self.assertLess(time.perf_counter() - started, 1.0)
+
+    def test_admission_before_handlers(self):
+        """Test requests are admitted by the ASGI layer and shed when their class is saturated"""
+        with mock.patch.dict(os.environ, {'ADMISSION_BUDGETS': 'query=4:8:1,sql=1:0:1,voice=1:1:1'}):
+            asgi_app = AsgiApp(create_app())
+        admission = asgi_app.admission
+        self.assertTrue(admission.handled_upstream)
+
+        held = admission.acquire('sql')
+        try:
+            status, data = call(asgi_app, 'POST', '/api/sql', json.dumps({'sql': 'SELECT 1'}).encode())
+            self.assertEqual(status, 429)
+            status, data = call(asgi_app, 'GET', '/api/examples')
+            self.assertEqual(status, 200)
+        finally:
+            admission.release(held)
+
+        self.assertEqual(admission.stats()['active'], 0)
+        self.assertEqual(admission.stats()['classes']['query']['admitted'], 1)
+
+    def test_profile_native_handler(self):
+        """Test X-Profile reports the pooled NLP and database work of a native handler"""
+        with mock.patch.dict(os.environ, {'PROFILING_TOKEN': 'secret'}):
+            asgi_app = AsgiApp(create_app())
+        body = json.dumps({'query': 'Show all employees'}).encode()
+
+        status, data = call(asgi_app, 'POST', '/api/query', body, [(b'x-profile', b'secret')])
+        self.assertEqual(status, 200)
+        components = ' '.join(data['profile']['components'])
+        self.assertIn('nlp_processor.py', components)
+        self.assertIn('database.py', components)
+
+        self.assertNotIn('profile', call(asgi_app, 'POST', '/api/query', body, [(b'x-profile', b'wrong')])[1])
+        asgi_app.nlp_executor.shutdown()
+        asgi_app.db_executor.shutdown()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,154 @@
+import unittest
+import io
+import json
+import os
+import wave
+from unittest import mock
+import numpy as np
+from app import create_app, MULTIPART_OVERHEAD_BYTES
+from app.audio_processor import AudioProcessor
+
+def make_wav(sample_rate=44100, channels=2, silence=1.0, tone=0.5):
+    """Build a WAV with a tone surrounded by silence"""
+    silent = np.zeros(int(sample_rate * silence))
+    t = np.arange(int(sample_rate * tone)) / sample_rate
+    signal = np.concatenate([silent, 0.5 * np.sin(2 * np.pi * 440 * t), silent])
+    pcm = (np.repeat(signal[:, None], channels, axis=1) * 32767).astype('<i2').tobytes()
+
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm)
+    return buffer.getvalue()
+
+class AudioProcessorTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.processor = AudioProcessor()
+
+    def test_process_resamples_and_trims(self):
+        """Test stereo 44.1 kHz audio becomes trimmed 16 kHz mono"""
+        result = self.processor.process(make_wav())
+        self.assertTrue(result['success'])
+        self.assertEqual(result['sample_rate'], 16000)
+
+        stats = result['stats']
+        self.assertAlmostEqual(stats['original_duration'], 2.5, places=2)
+        self.assertEqual(stats['original_channels'], 2)
+        # Tone plus up to two padding windows and frame rounding
+        self.assertGreater(stats['processed_duration'], 0.45)
+        self.assertLess(stats['processed_duration'], 1.0)
+        self.assertEqual(len(result['pcm']), int(stats['processed_duration'] * 16000) * 2)
+
+    def test_process_rejects_silence(self):
+        """Test silent recordings are reported instead of recognized"""
+        result = self.processor.process(make_wav(tone=0))
+        self.assertFalse(result['success'])
+
+    def test_read_upload_enforces_limit(self):
+        """Test uploads are read up to the size cap"""
+        data = b'x' * 1000
+        self.assertEqual(self.processor.read_upload(io.BytesIO(data), 1000)['data'], data)
+        self.assertFalse(self.processor.read_upload(io.BytesIO(data), 999)['success'])
+        self.assertEqual(self.processor.read_upload(io.BytesIO(data), 1000, chunk_size=64)['data'], data)
+
+class VoiceEndpointTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+
+    def test_voice_reports_audio_stats(self):
+        """Test preprocessed audio is recognized and its durations reported"""
+        recognized = {'success': True, 'text': 'show all employees', 'error': None}
+        with mock.patch('app.routes.speech_service.pcm_to_text', return_value=recognized) as pcm_to_text:
+            response = self.client.post('/api/voice',
+                                       data={'audio': (io.BytesIO(make_wav()), 'audio.wav')},
+                                       content_type='multipart/form-data')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(pcm_to_text.call_args[0][1], 16000)
+
+        data = json.loads(response.data)
+        self.assertTrue(data['success'])
+        self.assertLess(data['audio']['processed_duration'], data['audio']['original_duration'])
+
+    def test_transcripts_cached_without_preprocessing(self):
+        """Test a replayed upload skips recognition when preprocessing is off"""
+        self.app.config['AUDIO_PREPROCESSING'] = False
+        recognized = {'success': True, 'text': 'show all employees', 'error': None}
+        audio = make_wav(tone=0.7)
+        with mock.patch('app.routes.speech_service.audio_to_text', return_value=recognized) as audio_to_text:
+            for _ in range(2):
+                response = self.client.post('/api/voice',
+                                           data={'audio': (io.BytesIO(audio), 'audio.wav')},
+                                           content_type='multipart/form-data')
+
+        self.assertEqual(audio_to_text.call_count, 1)
+        self.assertTrue(json.loads(response.data)['transcript_cached'])
+
+    def test_cache_is_shared_across_preprocessing_modes(self):
+        """Test both voice paths key the cache on the same normalized samples"""
+        recognized = {'success': True, 'text': 'show all projects', 'error': None}
+        audio = make_wav(tone=0.9)
+        with mock.patch('app.routes.speech_service.pcm_to_text', return_value=recognized) as pcm_to_text:
+            self.client.post('/api/voice',
+                             data={'audio': (io.BytesIO(audio), 'audio.wav')},
+                             content_type='multipart/form-data')
+
+        self.app.config['AUDIO_PREPROCESSING'] = False
+        with mock.patch('app.routes.speech_service.audio_to_text') as audio_to_text:
+            response = self.client.post('/api/voice',
+                                       data={'audio': (io.BytesIO(audio), 'audio.wav')},
+                                       content_type='multipart/form-data')
+
+        self.assertEqual(pcm_to_text.call_count, 1)
+        audio_to_text.assert_not_called()
+        self.assertTrue(json.loads(response.data)['transcript_cached'])
+
+    def test_oversized_upload_rejected_before_parsing(self):
+        """Test a declared length over MAX_CONTENT_LENGTH is refused without reading the form"""
+        with mock.patch.dict(os.environ, {'VOICE_MAX_UPLOAD_BYTES': '1000'}):
+            app = create_app()
+        self.assertEqual(app.config['MAX_CONTENT_LENGTH'], 1000 + MULTIPART_OVERHEAD_BYTES)
+
+        with mock.patch('werkzeug.formparser.FormDataParser.parse') as parse:
+            response = app.test_client().post('/api/voice',
+                                              data={'audio': (io.BytesIO(make_wav()), 'audio.wav')},
+                                              content_type='multipart/form-data')
+
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(json.loads(response.data)['error'], 'Audio file exceeds the 1000 byte limit')
+        parse.assert_not_called()
+
+    def test_oversized_chunked_upload_rejected(self):
+        """Test a chunked body is cut off once it passes MAX_CONTENT_LENGTH"""
+        with mock.patch.dict(os.environ, {'VOICE_MAX_UPLOAD_BYTES': '1000'}):
+            app = create_app()
+
+        body = (b'--x\r\nContent-Disposition: form-data; name="audio"; filename="audio.wav"\r\n\r\n'
+                + make_wav() + b'\r\n--x--\r\n')
+        response = app.test_client().post('/api/voice', input_stream=io.BytesIO(body),
+                                          content_type='multipart/form-data; boundary=x',
+                                          headers={'Transfer-Encoding': 'chunked'},
+                                          environ_overrides={'wsgi.input_terminated': True})
+
+        self.assertEqual(response.status_code, 413)
+        self.assertFalse(json.loads(response.data)['success'])
+
+    def test_oversized_json_body_rejected(self):
+        """Test JSON endpoints answer an oversized body with a JSON 413"""
+        with mock.patch.dict(os.environ, {'VOICE_MAX_UPLOAD_BYTES': '1000'}):
+            app = create_app()
+
+        response = app.test_client().post('/api/query', data=json.dumps({'query': 'x' * 100000}),
+                                          content_type='application/json')
+
+        self.assertEqual(response.status_code, 413)
+        self.assertIn('byte limit', json.loads(response.data)['error'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+import unittest
+import os
+import tempfile
+import threading
+import time
+from app.coalescing import SingleFlight, normalize_query
+
+def run_concurrently(count, target):
+    """Start count threads on target and wait for all of them"""
+    results = [None] * count
+
+    def worker(i):
+        results[i] = target()
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+class SingleFlightTestCase(unittest.TestCase):
+
+    def test_concurrent_callers_share_execution(self):
+        """Test identical in-flight keys run once"""
+        flight = SingleFlight()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return {'row_count': 3}
+
+        results = run_concurrently(8, lambda: flight.do('query:show all employees', compute))
+
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(all(result == {'row_count': 3} for result in results))
+        self.assertEqual(flight.stats()['saved'], 7)
+        self.assertEqual(flight.stats()['in_flight'], 0)
+
+    def test_sequential_calls_are_not_shared(self):
+        """Test completed computations are not reused"""
+        flight = SingleFlight()
+        flight.do('key', lambda: 1)
+        flight.do('key', lambda: 2)
+        self.assertEqual(flight.stats()['executions'], 2)
+
+    def test_errors_reach_every_waiter(self):
+        """Test waiters see the leader's exception"""
+        flight = SingleFlight()
+
+        def fail():
+            time.sleep(0.1)
+            raise ValueError('boom')
+
+        def call():
+            try:
+                flight.do('key', fail)
+            except ValueError as e:
+                return str(e)
+
+        self.assertEqual(run_concurrently(4, call), ['boom'] * 4)
+
+    def test_workers_share_through_lock_dir(self):
+        """Test separate coalescers on one lock directory share results"""
+        with tempfile.TemporaryDirectory() as lock_dir:
+            workers = [SingleFlight(lock_dir), SingleFlight(lock_dir)]
+            calls = []
+
+            def compute():
+                calls.append(1)
+                time.sleep(0.2)
+                return ['SELECT 1', 'count', {'row_count': 1}]
+
+            barrier = threading.Barrier(2)
+
+            def call(worker):
+                barrier.wait()
+                return worker.do('sql:SELECT 1', compute)
+
+            results = [None, None]
+            threads = [threading.Thread(target=lambda i=i: results.__setitem__(i, call(workers[i]))) for i in range(2)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            self.assertEqual(len(calls), 1)
+            self.assertEqual(results[0], results[1])
+            self.assertEqual(sum(w.stats()['shared_from_peers'] for w in workers), 1)
+            # The follower that read the shared result removed it
+            self.assertEqual([name for name in os.listdir(lock_dir) if name.endswith('.json')], [])
+
+    def test_results_written_only_for_waiters(self):
+        """Test a worker with no peer waiting writes no result file"""
+        with tempfile.TemporaryDirectory() as lock_dir:
+            flight = SingleFlight(lock_dir)
+            for i in range(5):
+                flight.do(f'sql:SELECT {i}', lambda: {'row_count': 1})
+            self.assertEqual([name for name in os.listdir(lock_dir) if name.endswith('.json')], [])
+
+    def test_sweep_bounds_the_lock_dir(self):
+        """Test stale files are swept and the directory is capped"""
+        with tempfile.TemporaryDirectory() as lock_dir:
+            flight = SingleFlight(lock_dir, result_ttl=60, max_files=4)
+            for i in range(10):
+                flight.do(f'sql:SELECT {i}', lambda: 1)
+            self.assertEqual(len(os.listdir(lock_dir)), 20)
+
+            flight.sweep()
+            self.assertEqual(len(os.listdir(lock_dir)), 4)
+
+            flight.result_ttl = 0
+            flight.sweep()
+            self.assertEqual(os.listdir(lock_dir), [])
+            self.assertEqual(flight.stats()['swept'], 20)
+
+    def test_normalize_query(self):
+        """Test case and spacing differences coalesce"""
+        self.assertEqual(normalize_query('  Show ALL   employees '), 'show all employees')
+
+if __name__ == '__main__':
+    unittest.main()
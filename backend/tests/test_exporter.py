@@ -0,0 +1,137 @@
+import unittest
+import csv
+import io
+import json
+from unittest import mock
+import pyarrow as pa
+import pyarrow.parquet as pq
+from app import create_app
+from app.database import declared_column_types
+from app.exporter import stream_export, ExportStats
+
+COLUMNS = ['id', 'name', 'salary', 'end_date']
+
+def batches():
+    yield [(1, 'Ann', 75000.0, None), (2, 'Bob', 65000.0, None)]
+    yield [(3, 'Cy', 80000.5, '2023-06-30')]
+
+class StreamExportTestCase(unittest.TestCase):
+
+    def test_csv(self):
+        """Test CSV output has a header and every row"""
+        stats = ExportStats()
+        body = b''.join(stream_export(COLUMNS, batches(), 'csv', stats)).decode()
+
+        rows = list(csv.reader(io.StringIO(body)))
+        self.assertEqual(rows[0], COLUMNS)
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(stats.stats(), {'exports': 1, 'rows': 3, 'bytes': len(body)})
+
+    def test_parquet_round_trip(self):
+        """Test each batch becomes a row group and late non-null values keep the schema"""
+        body = b''.join(stream_export(COLUMNS, batches(), 'parquet'))
+
+        parquet = pq.ParquetFile(io.BytesIO(body))
+        self.assertEqual(parquet.metadata.num_row_groups, 2)
+        table = parquet.read()
+        self.assertEqual(table.column_names, COLUMNS)
+        self.assertEqual(table.column('end_date').to_pylist(), [None, None, '2023-06-30'])
+
+    def test_arrow_stream_round_trip(self):
+        """Test the Arrow IPC stream reads back batch by batch"""
+        body = b''.join(stream_export(COLUMNS, batches(), 'arrow'))
+
+        reader = pa.ipc.open_stream(body)
+        self.assertEqual([batch.num_rows for batch in reader], [2, 1])
+
+    def test_drifting_types_are_widened(self):
+        """Test later batches of another SQLite type widen the column instead of truncating or failing"""
+        def drifting():
+            yield [(75000,), (65000,)]
+            yield [(80000.5,)]
+            yield [('n/a',)]
+
+        table = pq.read_table(io.BytesIO(b''.join(stream_export(
+            ['salary'], drifting(), 'parquet', column_types=[{'integer', 'real', 'text'}]))))
+        self.assertEqual(table.column('salary').to_pylist(), ['75000', '65000', '80000.5', 'n/a'])
+
+        body = b''.join(stream_export(['salary'], iter([[(1,)], [(80000.5,)]]), 'arrow',
+                                      column_types=[{'integer', 'real'}]))
+        self.assertEqual(pa.ipc.open_stream(body).read_all().column('salary').to_pylist(), [1.0, 80000.5])
+
+    def test_declared_types_widen_the_first_batch(self):
+        """Test declared types fill in all-null columns and widen a disagreeing first batch to strings"""
+        body = b''.join(stream_export(['salary', 'bonus'], iter([[('n/a', None)], [(1.5, 7)]]), 'parquet',
+                                      declared_types=[{'real'}, {'integer'}]))
+        table = pq.read_table(io.BytesIO(body))
+        self.assertEqual(table.column('salary').to_pylist(), ['n/a', '1.5'])
+        self.assertEqual(table.schema.field('bonus').type, pa.int64())
+
+        with self.assertRaises(ValueError):
+            b''.join(stream_export(['bonus'], iter([[(1,)], [(2.5,)]]), 'arrow'))
+
+    def test_empty_result(self):
+        """Test empty results still produce a valid file"""
+        self.assertEqual(b''.join(stream_export(COLUMNS, iter([]), 'csv')).decode().strip(), ','.join(COLUMNS))
+        self.assertEqual(pq.read_table(io.BytesIO(b''.join(stream_export(COLUMNS, iter([]), 'parquet')))).num_rows, 0)
+
+class ExportAPITestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+
+    def export(self, **body):
+        return self.client.post('/api/export', data=json.dumps(body), content_type='application/json')
+
+    def test_export_sql_as_csv(self):
+        """Test validated SQL streams as CSV"""
+        response = self.export(sql='SELECT id, first_name FROM employees', format='csv')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'text/csv')
+
+        rows = list(csv.reader(io.StringIO(response.data.decode())))
+        self.assertEqual(rows[0], ['id', 'first_name'])
+        self.assertGreater(len(rows), 1)
+
+    def test_export_query_as_arrow(self):
+        """Test natural language queries stream as Arrow IPC"""
+        response = self.export(query='Show all projects', format='arrow')
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(pa.ipc.open_stream(response.data).read_all().num_rows, 0)
+
+    def test_export_mixed_types(self):
+        """Test a column mixing integers, reals and text exports every value intact"""
+        sql = "SELECT 75000 AS salary UNION ALL SELECT 80000.5 UNION ALL SELECT 'n/a'"
+        with mock.patch.dict(self.app.config, {'EXPORT_BATCH_SIZE': 1}):
+            response = self.export(sql=sql, format='parquet', probe_types=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(pq.read_table(io.BytesIO(response.data)).column('salary').to_pylist(),
+                         ['75000', '80000.5', 'n/a'])
+
+    def test_export_types_without_probe(self):
+        """Test typed exports run the query once, typing columns from the first batch and the schema"""
+        with mock.patch('app.routes.probe_column_types') as probe:
+            response = self.export(sql='SELECT id, salary, hire_date FROM employees', format='arrow')
+        probe.assert_not_called()
+
+        schema = pa.ipc.open_stream(response.data).schema
+        self.assertEqual([schema.field(name).type for name in ('id', 'salary', 'hire_date')],
+                         [pa.int64(), pa.float64(), pa.string()])
+
+        with self.app.app_context():
+            self.assertEqual(declared_column_types(
+                'SELECT e.id, e.salary, e.hire_date, d.name AS department_name '
+                'FROM employees e JOIN departments d ON e.department_id = d.id',
+                ['id', 'salary', 'hire_date', 'department_name']
+            ), [{'integer'}, {'real'}, set(), set()])
+
+    def test_export_rejects_bad_requests(self):
+        """Test unknown formats, writes and broken SQL are rejected before streaming"""
+        self.assertEqual(self.export(sql='SELECT 1', format='xlsx').status_code, 400)
+        self.assertEqual(self.export(sql='DROP TABLE employees').status_code, 400)
+        self.assertEqual(self.export(sql='SELECT * FROM missing_table').status_code, 400)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+import unittest
+import json
+import os
+import tempfile
+from app import create_app
+from app.nlp_processor import NLPProcessor
+from app.routes import QUERY_EXAMPLES
+
+# Intents the classifier gave each example before full-text search was added
+BASELINE_INTENTS = {
+    'Show all employees': 'select_all',
+    'How many employees work in IT?': 'count',
+    'Show employees with salary greater than 70000': 'select_with_condition',
+    'What is the average salary?': 'aggregate',
+    'List employees hired after 2020': 'select_with_condition',
+    'Show all projects': 'select_all',
+    'Count employees in each department': 'count',
+    'Show highest paid employee': 'aggregate'
+}
+
+class IntentFeedbackTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.model_path = os.path.join(self.tmpdir.name, 'intent_classifier.pkl')
+        self.processor = NLPProcessor(self.model_path, reload_interval=0)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_feedback_updates_and_publishes(self):
+        """Test a correction changes the prediction and bumps the version"""
+        version = self.processor.model_version
+
+        result = self.processor.learn('who earns the most salary', 'aggregate')
+
+        self.assertTrue(result['updated'])
+        self.assertEqual(result['model_version'], version + 1)
+        self.assertEqual(self.processor.classify_intent('who earns the most salary'), 'aggregate')
+
+    def test_other_workers_hot_swap(self):
+        """Test a second processor on the same model file swaps to the new version"""
+        worker = NLPProcessor(self.model_path, reload_interval=0)
+        self.processor.learn('who earns the most salary', 'aggregate')
+
+        self.assertTrue(worker.maybe_reload())
+        self.assertEqual(worker.model_version, self.processor.model_version)
+        self.assertEqual(worker.classify_intent('who earns the most salary'), 'aggregate')
+
+    def test_feedback_survives_retraining(self):
+        """Test recorded corrections are part of a full retrain"""
+        self.processor.learn('who earns the most salary', 'aggregate')
+        self.processor.train_model()
+        self.assertEqual(self.processor.classify_intent('who earns the most salary'), 'aggregate')
+
+    def test_translation_reports_its_model_version(self):
+        """Test the version returned with a translation is the one that classified it"""
+        old_model = self.processor.model
+        self.processor.learn('who earns the most salary', 'aggregate')
+
+        sql_query, intent, confidence, version = self.processor.translate('who earns the most salary')
+        self.assertEqual((intent, version), ('aggregate', old_model[0] + 1))
+        self.assertEqual(sql_query, self.processor.build_aggregate_query('who earns the most salary'))
+
+        self.processor.model = old_model
+        self.assertEqual(self.processor.predict_intent('show all employees')[2], old_model[0])
+
+    def test_unknown_intent_rejected(self):
+        """Test feedback must name an existing intent"""
+        with self.assertRaises(ValueError):
+            self.processor.learn('show all employees', 'delete_everything')
+
+class ExampleIntentTestCase(unittest.TestCase):
+
+    def test_examples_keep_baseline_intents(self):
+        """Test every /api/examples query still translates with its original intent"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            processor = NLPProcessor(os.path.join(tmpdir, 'intent_classifier.pkl'), reload_interval=0)
+            intents = {example['text']: processor.translate(example['text'])[1] for example in QUERY_EXAMPLES}
+
+        self.assertEqual(intents, BASELINE_INTENTS)
+
+class FeedbackAPITestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+
+    def test_query_reports_model_version(self):
+        """Test query responses carry the model version"""
+        response = self.client.post('/api/query', data=json.dumps({'query': 'Show all projects'}),
+                                    content_type='application/json')
+        self.assertIn('model_version', json.loads(response.data))
+
+    def test_feedback_requires_token(self):
+        """Test feedback is refused without the configured token, and while none is configured"""
+        body = json.dumps({'query': 'payroll', 'intent': 'count'})
+        response = self.client.post('/api/feedback', data=body, content_type='application/json')
+        self.assertEqual(response.status_code, 403)
+
+        self.app.config['FEEDBACK_TOKEN'] = 'secret'
+        response = self.client.post('/api/feedback', data=body, content_type='application/json',
+                                    headers={'X-Feedback-Token': 'wrong'})
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(json.loads(response.data)['success'])
+
+    def test_feedback_requires_known_intent(self):
+        """Test the feedback endpoint validates the intent"""
+        self.app.config['FEEDBACK_TOKEN'] = 'secret'
+        response = self.client.post('/api/feedback', data=json.dumps({'query': 'payroll', 'intent': 'nope'}),
+                                    content_type='application/json', headers={'X-Feedback-Token': 'secret'})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(json.loads(response.data)['success'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import unittest
+import json
+import os
+import threading
+import time
+from unittest import mock
+from app import create_app
+from app.profiling import SamplingProfiler
+
+class SamplingProfilerTestCase(unittest.TestCase):
+
+    def test_collapsed_stacks(self):
+        """Test samples of other threads come out as collapsed stacks"""
+        done = threading.Event()
+
+        def busy_worker():
+            while not done.is_set():
+                sum(range(1000))
+
+        worker = threading.Thread(target=busy_worker)
+        worker.start()
+        profiler = SamplingProfiler()
+        try:
+            self.assertTrue(profiler.start(interval=0.001))
+            self.assertFalse(profiler.start())
+            time.sleep(0.1)
+        finally:
+            collapsed = profiler.stop()
+            done.set()
+            worker.join()
+
+        self.assertFalse(profiler.running)
+        self.assertGreater(profiler.stats()['samples'], 0)
+        lines = collapsed.splitlines()
+        self.assertTrue(any('busy_worker (test_profiling.py' in line for line in lines))
+        self.assertTrue(all(line.rsplit(' ', 1)[1].isdigit() for line in lines))
+
+class ProfilingAPITestCase(unittest.TestCase):
+
+    def setUp(self):
+        with mock.patch.dict(os.environ, {'PROFILING_TOKEN': 'secret'}):
+            self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+
+    def test_request_profile(self):
+        """Test the profile header attaches a summary covering the NLP and DB layers"""
+        response = self.client.post('/api/query', data=json.dumps({'query': 'Show all employees'}),
+                                    content_type='application/json', headers={'X-Profile': 'secret'})
+        profile = json.loads(response.data)['profile']
+        self.assertGreater(len(profile['top_functions']), 0)
+        components = ' '.join(profile['components'])
+        self.assertIn('nlp_processor.py', components)
+        self.assertIn('database.py', components)
+
+        response = self.client.post('/api/query', data=json.dumps({'query': 'Show all employees'}),
+                                    content_type='application/json', headers={'X-Profile': 'wrong'})
+        self.assertNotIn('profile', json.loads(response.data))
+
+    def test_admin_endpoints(self):
+        """Test the sampling profiler needs the admin token and returns collapsed stacks"""
+        self.assertEqual(self.client.post('/api/admin/profiler/start').status_code, 403)
+
+        headers = {'X-Admin-Token': 'secret'}
+        response = self.client.post('/api/admin/profiler/start', data=json.dumps({'interval_ms': 1}),
+                                    content_type='application/json', headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.client.get('/api/examples')
+        time.sleep(0.05)
+
+        response = self.client.post('/api/admin/profiler/stop', headers=headers)
+        self.assertEqual(response.mimetype, 'text/plain')
+        status = json.loads(self.client.get('/api/admin/profiler', headers=headers).data)['profiler']
+        self.assertFalse(status['running'])
+        self.assertGreater(status['samples'], 0)
+
+    def test_disabled_by_default(self):
+        """Test nothing is installed without a token"""
+        with mock.patch.dict(os.environ, {'PROFILING_TOKEN': ''}):
+            app = create_app()
+        self.assertNotIn('profiling', app.blueprints)
+        self.assertEqual(app.test_client().get('/api/admin/profiler').status_code, 404)
+
+if __name__ == '__main__':
+    unittest.main()
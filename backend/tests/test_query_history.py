@@ -0,0 +1,123 @@
+import unittest
+import json
+import os
+import sqlite3
+import tempfile
+from unittest import mock
+from sqlalchemy import create_engine, text
+from app import create_app, db
+from app.models import QueryHistory
+from app.query_history import QueryHistoryLog
+
+def history_record(i=0):
+    return {
+        'source': 'text', 'query_text': f'Show all employees {i}', 'normalized_query': 'show all employees',
+        'sql_query': 'SELECT * FROM employees', 'intent': 'select_all', 'confidence': 0.9,
+        'row_count': 10, 'latency_ms': 5.0, 'success': True
+    }
+
+class QueryHistoryLogTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.engine = create_engine('sqlite:///' + os.path.join(self.tmpdir.name, 'history.db'))
+        QueryHistory.__table__.create(self.engine)
+
+    def tearDown(self):
+        self.engine.dispose()
+        self.tmpdir.cleanup()
+
+    def count_rows(self):
+        with self.engine.connect() as conn:
+            return conn.execute(text("SELECT COUNT(*) FROM query_history")).scalar()
+
+    def test_flush_writes_in_batches(self):
+        """Test queued records are inserted in batch_size chunks"""
+        history = QueryHistoryLog(self.engine, batch_size=4)
+        for i in range(10):
+            self.assertTrue(history.record(**history_record(i)))
+
+        history.flush()
+        self.assertEqual(self.count_rows(), 10)
+        self.assertEqual(history.stats()['batches'], 3)
+
+    def test_overload_samples_then_drops(self):
+        """Test records are sampled past the high-water mark and dropped when full"""
+        history = QueryHistoryLog(self.engine, max_queue=10, high_water=0.5, sample_rate=1.0)
+        for i in range(15):
+            history.record(**history_record(i))
+        self.assertEqual(history.stats()['dropped'], 5)
+
+        history = QueryHistoryLog(self.engine, max_queue=10, high_water=0.5, sample_rate=0.0)
+        for i in range(15):
+            history.record(**history_record(i))
+        stats = history.stats()
+        self.assertEqual(stats['enqueued'], 5)
+        self.assertEqual(stats['sampled_out'], 10)
+
+    def test_background_writer(self):
+        """Test the writer thread flushes on its own and on close"""
+        history = QueryHistoryLog(self.engine, flush_interval=0.05).start()
+        history.record(**history_record())
+        history.close()
+        self.assertEqual(self.count_rows(), 1)
+
+    def test_wait_for_writer(self):
+        """Test wait returns once the writer thread has persisted queued records"""
+        history = QueryHistoryLog(self.engine, flush_interval=0.05)
+        history.record(**history_record())
+        self.assertFalse(history.wait(0.01))
+
+        history.start()
+        self.assertTrue(history.wait(5))
+        self.assertEqual(self.count_rows(), 1)
+        history.close()
+
+class QueryHistoryAPITestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+
+    def test_history_endpoint(self):
+        """Test processed queries show up in the aggregated history"""
+        self.client.post('/api/query', data=json.dumps({'query': 'How many   PROJECTS'}),
+                         content_type='application/json')
+
+        response = self.client.get('/api/history?limit=100')
+        self.assertEqual(response.status_code, 200)
+
+        data = json.loads(response.data)
+        self.assertTrue(data['success'])
+        self.assertGreaterEqual(data['stats']['total_queries'], 1)
+        self.assertIn('how many projects', [row['query'] for row in data['stats']['top_queries']])
+        self.assertIn('count', [row['intent'] for row in data['stats']['slowest_intents']])
+
+    def test_history_has_its_own_database(self):
+        """Test history rows go to the history bind, not the database queries read"""
+        with tempfile.TemporaryDirectory() as tmp:
+            main_path = os.path.join(tmp, 'main.db')
+            history_path = os.path.join(tmp, 'history.db')
+            with mock.patch.dict(os.environ, {'DATABASE_URL': 'sqlite:///' + main_path,
+                                              'QUERY_HISTORY_DATABASE_URL': 'sqlite:///' + history_path}):
+                app = create_app()
+            app.config['TESTING'] = True
+            app.test_client().post('/api/query', data=json.dumps({'query': 'How many projects'}),
+                                   content_type='application/json')
+            app.extensions['query_history'].close()
+
+            main = sqlite3.connect(main_path)
+            history = sqlite3.connect(history_path)
+            try:
+                self.assertIsNone(main.execute("SELECT name FROM sqlite_master WHERE name = 'query_history'").fetchone())
+                self.assertEqual(history.execute("SELECT COUNT(*) FROM query_history").fetchone()[0], 1)
+            finally:
+                main.close()
+                history.close()
+            with app.app_context():
+                for engine in db.engines.values():
+                    engine.dispose()
+
+if __name__ == '__main__':
+    unittest.main()
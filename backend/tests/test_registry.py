@@ -0,0 +1,146 @@
+import unittest
+import json
+import os
+import sqlite3
+import tempfile
+from unittest import mock
+from app import create_app
+from app.registry import DatabaseRegistry, parse_databases
+
+def create_department_db(path, departments):
+    connection = sqlite3.connect(path)
+    connection.executescript("""
+        CREATE TABLE departments (id INTEGER PRIMARY KEY, name TEXT, description TEXT);
+        CREATE TABLE employees (id INTEGER PRIMARY KEY, first_name TEXT, last_name TEXT,
+                                department_id INTEGER, salary REAL, hire_date TEXT);
+    """)
+    for index, name in enumerate(departments, 1):
+        connection.execute("INSERT INTO departments VALUES (?, ?, '')", (index, name))
+        connection.execute("INSERT INTO employees VALUES (?, 'Ann', 'Lee', ?, 50000, '2021-01-01')", (index, index))
+    connection.commit()
+    connection.close()
+
+class DatabaseRegistryTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.paths = {}
+        for name in ('north', 'south', 'west'):
+            self.paths[name] = os.path.join(self.tmp.name, f'{name}.db')
+            create_department_db(self.paths[name], [f'{name.title()} Ops'])
+        self.registry = DatabaseRegistry(self.paths, max_open=2)
+
+    def tearDown(self):
+        self.registry.close()
+        self.tmp.cleanup()
+
+    def test_parse_databases(self):
+        """Test databases come from a directory and an explicit list"""
+        databases = parse_databases('extra=/data/extra.db', self.tmp.name)
+        self.assertEqual(sorted(databases), ['extra', 'north', 'south', 'west'])
+        with self.assertRaises(ValueError):
+            parse_databases('missing-path')
+
+    def test_lazy_open_and_lru_eviction(self):
+        """Test databases open on first use and the least recently used idle one is closed past the cap"""
+        with self.registry.checkout('north') as north:
+            self.assertFalse(north.is_open)
+            north.execute('SELECT 1')
+            self.assertTrue(north.is_open)
+
+        for name in ('south', 'north', 'west'):
+            with self.registry.checkout(name) as handle:
+                handle.execute('SELECT 1')
+
+        self.assertEqual([db['name'] for db in self.registry.stats()['open']], ['north', 'west'])
+        self.assertFalse(self.registry._handles['south'].is_open)
+        self.assertEqual(self.registry.stats()['evictions'], 1)
+
+    def test_busy_databases_are_not_evicted(self):
+        """Test a database with a checked-out connection stays open"""
+        with self.registry.checkout('north') as north, north.connection():
+            for name in ('south', 'west'):
+                with self.registry.checkout(name):
+                    pass
+            self.assertTrue(north.is_open)
+
+    def test_leased_databases_are_not_evicted(self):
+        """Test a handle returned by get() cannot be closed by another get() before it is used"""
+        north = self.registry.get('north')
+        north.execute('SELECT 1')
+        for name in ('south', 'west'):
+            with self.registry.checkout(name) as handle:
+                handle.execute('SELECT 1')
+        self.assertTrue(north.is_open)
+
+        self.registry.release(north)
+        with self.registry.checkout('south'):
+            pass
+        self.assertFalse(north.is_open)
+        self.assertEqual(self.registry.stats()['evictions'], 2)
+
+    def test_catalog_is_cached_until_the_file_changes(self):
+        """Test the schema and vocabulary are re-read only after a write"""
+        handle = self.registry.get('north')
+        catalog = handle.catalog()
+        self.assertEqual(catalog['vocabulary']['departments'], ['North Ops'])
+        self.assertEqual([table['name'] for table in catalog['schema']['tables']], ['departments', 'employees'])
+        self.assertIs(handle.catalog(), catalog)
+
+        connection = sqlite3.connect(self.paths['north'])
+        connection.execute("INSERT INTO departments VALUES (9, 'Research', '')")
+        connection.commit()
+        connection.close()
+        os.utime(self.paths['north'], ns=(0, os.stat(self.paths['north']).st_mtime_ns + 1))
+
+        self.assertIn('Research', handle.catalog()['vocabulary']['departments'])
+
+    def test_read_only(self):
+        """Test registry connections cannot write"""
+        with self.assertRaises(sqlite3.DatabaseError):
+            self.registry.get('north').execute('DELETE FROM employees')
+
+class MultiDatabaseAPITestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        create_department_db(os.path.join(self.tmp.name, 'research.db'), ['Robotics', 'Genomics'])
+        with mock.patch.dict(os.environ, {'DATABASE_DIR': self.tmp.name}):
+            self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        self.app.extensions['databases'].close()
+        self.tmp.cleanup()
+
+    def post(self, url, **body):
+        return json.loads(self.client.post(url, data=json.dumps(body), content_type='application/json').data)
+
+    def test_requests_target_a_database(self):
+        """Test queries, SQL and schema requests run against the named database"""
+        data = self.post('/api/sql', sql='SELECT name FROM departments', database='research')
+        self.assertEqual([row['name'] for row in data['results']], ['Robotics', 'Genomics'])
+
+        data = self.post('/api/query', query='Show employees in genomics', database='research')
+        self.assertIn("'GENOMICS'", data['sql_query'])
+        self.assertEqual(data['row_count'], 1)
+
+        schema = json.loads(self.client.get('/api/schema?database=research').data)['schema']
+        self.assertEqual([table['name'] for table in schema['tables']], ['departments', 'employees'])
+
+        self.assertEqual(self.post('/api/sql', sql='SELECT COUNT(*) AS n FROM projects')['row_count'], 1)
+        # Every request returned its lease
+        self.assertEqual(self.app.extensions['databases'].stats()['open'][0]['leases'], 0)
+
+    def test_unknown_database(self):
+        """Test naming a database that is not registered is rejected"""
+        response = self.client.post('/api/sql', data=json.dumps({'sql': 'SELECT 1', 'database': 'nope'}),
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+        databases = json.loads(self.client.get('/api/databases').data)['databases']
+        self.assertEqual(databases, ['default', 'research'])
+
+if __name__ == '__main__':
+    unittest.main()
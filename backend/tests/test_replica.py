@@ -0,0 +1,138 @@
+import unittest
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from unittest import mock
+from app import create_app
+from app.replica import ReadReplica
+
+class ReadReplicaTestCase(unittest.TestCase):
+
+    def setUp(self):
+        """Create a small on-disk database to replicate"""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, 'replica.db')
+
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)")
+        conn.execute("INSERT INTO items (name) VALUES ('first')")
+        conn.commit()
+        conn.close()
+
+        self.replica = ReadReplica(self.db_path, sync_interval=0)
+
+    def tearDown(self):
+        self.replica.close()
+        self.tmpdir.cleanup()
+
+    def test_reads_from_memory(self):
+        """Test queries are answered from the replica"""
+        columns, rows = self.replica.execute("SELECT id, name FROM items")
+        self.assertEqual(columns, ['id', 'name'])
+        self.assertEqual(rows, [(1, 'first')])
+
+    def test_rejects_writes(self):
+        """Test the replica is read-only"""
+        with self.assertRaises(sqlite3.OperationalError):
+            self.replica.execute("INSERT INTO items (name) VALUES ('second')")
+
+    def write_second_item(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("INSERT INTO items (name) VALUES ('second')")
+        conn.commit()
+        conn.close()
+        # Make sure the signature changes even on coarse-grained filesystems
+        os.utime(self.db_path, ns=(0, 0))
+
+    def test_resyncs_on_change(self):
+        """Test disk changes are picked up by the next sync check"""
+        self.assertFalse(self.replica.maybe_sync())
+        self.write_second_item()
+
+        self.assertTrue(self.replica.maybe_sync())
+        _, rows = self.replica.execute("SELECT COUNT(*) FROM items")
+        self.assertEqual(rows[0][0], 2)
+        self.assertEqual(self.replica.sync_count, 2)
+
+    def test_background_sync(self):
+        """Test the sync thread picks up changes without a read triggering it"""
+        replica = ReadReplica(self.db_path, sync_interval=0.01).start()
+        try:
+            self.write_second_item()
+            deadline = time.monotonic() + 5
+            while replica.sync_count < 2 and time.monotonic() < deadline:
+                time.sleep(0.01)
+
+            self.assertEqual(replica.sync_count, 2)
+            self.assertEqual(replica.execute("SELECT COUNT(*) FROM items")[1][0][0], 2)
+        finally:
+            replica.close()
+
+    def test_sync_closes_stale_connections(self):
+        """Test idle readers of an old generation are closed by a sync, busy ones when returned"""
+        with self.replica.connection(), self.replica.connection():
+            pass
+        self.assertEqual(self.replica.stats()['idle_connections'], 2)
+
+        with self.replica.connection() as busy:
+            idle = self.replica._idle[0]
+            self.replica.sync()
+            with self.assertRaises(sqlite3.ProgrammingError):
+                idle.execute("SELECT 1")
+            self.assertEqual(busy.execute("SELECT COUNT(*) FROM items").fetchone()[0], 1)
+
+        with self.assertRaises(sqlite3.ProgrammingError):
+            busy.execute("SELECT 1")
+        self.assertEqual(self.replica.stats()['idle_connections'], 0)
+
+    def test_reader_racing_a_sync(self):
+        """Test a reader connecting while a sync swaps generations still sees the data"""
+        real_connect = sqlite3.connect
+        syncs = []
+
+        def connect(database, *args, **kwargs):
+            # The first in-memory connection is the reader's: run a full sync before it is opened
+            if 'mode=memory' in database and not syncs:
+                syncs.append(threading.Thread(target=self.replica.sync))
+                syncs[0].start()
+                syncs[0].join(0.2)
+            return real_connect(database, *args, **kwargs)
+
+        with mock.patch('app.replica.sqlite3.connect', side_effect=connect):
+            _, rows = self.replica.execute("SELECT COUNT(*) FROM items")
+        syncs[0].join()
+
+        self.assertEqual(rows[0][0], 1)
+        self.assertEqual(self.replica.sync_count, 2)
+
+class ReadReplicaAPITestCase(unittest.TestCase):
+
+    def setUp(self):
+        """Set up test client with the read replica enabled"""
+        with mock.patch.dict(os.environ, {'READ_REPLICA': 'true'}):
+            self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        self.app.extensions['read_replica'].close()
+
+    def test_query_served_from_replica(self):
+        """Test natural language queries run against the replica"""
+        response = self.client.post('/api/query',
+                                   data=json.dumps({'query': 'Show all employees'}),
+                                   content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+
+        data = json.loads(response.data)
+        self.assertTrue(data['success'])
+        self.assertGreater(data['row_count'], 0)
+
+        health = json.loads(self.client.get('/api/health').data)
+        self.assertIn('read_replica', health)
+
+if __name__ == '__main__':
+    unittest.main()
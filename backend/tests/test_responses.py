@@ -0,0 +1,58 @@
+import unittest
+import gzip
+import json
+from datetime import date, datetime
+from app import create_app
+from app.responses import encode_json, negotiate_encoding, available_encodings
+
+class EncodeJSONTestCase(unittest.TestCase):
+
+    def test_dates_and_floats(self):
+        """Test dates are ISO 8601 and non-finite floats become null"""
+        body = encode_json({'hired': date(2020, 1, 15), 'at': datetime(2023, 1, 1, 9, 30),
+                            'nan': float('nan'), 'inf': float('inf'), 'salary': 75000.5})
+        self.assertEqual(json.loads(body), {'hired': '2020-01-15', 'at': '2023-01-01T09:30:00',
+                                            'nan': None, 'inf': None, 'salary': 75000.5})
+
+    def test_negotiate_encoding(self):
+        """Test Accept-Encoding negotiation honours q-values"""
+        self.assertIsNone(negotiate_encoding(None))
+        self.assertIsNone(negotiate_encoding('identity'))
+        self.assertEqual(negotiate_encoding('gzip'), 'gzip')
+        self.assertIsNone(negotiate_encoding('gzip;q=0'))
+        self.assertEqual(negotiate_encoding('gzip, deflate, br, zstd'), available_encodings()[0])
+        self.assertEqual(negotiate_encoding('br;q=0.5, gzip;q=1.0'), 'gzip')
+
+class CompressionTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+
+    def query(self, **headers):
+        return self.client.post('/api/query', data=json.dumps({'query': 'Show all employees'}),
+                                content_type='application/json', headers=headers)
+
+    def test_large_responses_are_compressed(self):
+        """Test JSON above the threshold is gzip-encoded when accepted"""
+        response = self.query(**{'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+
+        data = json.loads(gzip.decompress(response.data))
+        self.assertTrue(data['success'])
+
+    def test_uncompressed_without_accept_encoding(self):
+        """Test clients that don't ask for compression get plain JSON"""
+        response = self.query()
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertTrue(json.loads(response.data)['success'])
+
+    def test_small_responses_are_not_compressed(self):
+        """Test responses below the threshold are sent as-is"""
+        response = self.client.get('/api/suggest?prefix=zzzz', headers={'Accept-Encoding': 'gzip'})
+        self.assertNotIn('Content-Encoding', response.headers)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import unittest
+import json
+import sqlite3
+from app import create_app
+from app.routes import nlp_processor
+from app.search import init_search_index, match_expression
+
+class SearchIndexTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.connection = sqlite3.connect(':memory:')
+        self.connection.executescript("""
+            CREATE TABLE departments (id INTEGER PRIMARY KEY, name TEXT, description TEXT);
+            CREATE TABLE projects (id INTEGER PRIMARY KEY, name TEXT, description TEXT);
+            CREATE TABLE employees (id INTEGER PRIMARY KEY, first_name TEXT, last_name TEXT);
+            INSERT INTO projects VALUES (1, 'Data Platform', 'Analytics and reporting');
+            INSERT INTO employees VALUES (1, 'Jane', 'Smith');
+        """)
+        self.assertTrue(init_search_index(self.connection))
+
+    def search(self, *terms, column=None):
+        return self.connection.execute(
+            "SELECT kind, ref_id FROM search_index WHERE search_index MATCH ? ORDER BY rank",
+            (match_expression(terms, column),)
+        ).fetchall()
+
+    def test_existing_rows_are_indexed(self):
+        """Test rows present when the index is created are searchable"""
+        self.assertEqual(self.search('analytic'), [('project', 1)])
+        self.assertEqual(self.search('smith', column='title'), [('employee', 1)])
+
+    def test_triggers_keep_index_in_sync(self):
+        """Test inserts, updates and deletes on source tables reach the index"""
+        self.connection.execute("INSERT INTO departments VALUES (1, 'Research', 'Machine learning lab')")
+        self.assertEqual(self.search('learning'), [('department', 1)])
+
+        self.connection.execute("UPDATE projects SET description = 'Billing migration' WHERE id = 1")
+        self.assertEqual(self.search('analytics'), [])
+        self.assertEqual(self.search('billing'), [('project', 1)])
+
+        self.connection.execute("DELETE FROM employees WHERE id = 1")
+        self.assertEqual(self.search('smith'), [])
+
+    def test_match_expression_is_escaped(self):
+        """Test quotes and FTS5 operators in user input are neutralized"""
+        self.assertEqual(match_expression(["o'brien NEAR(x"]), '"o"* "brien"* "near"* "x"*')
+        self.assertEqual(match_expression(['smith'], 'title'), 'title : ("smith"*)')
+        self.assertIsNone(match_expression(['?!']))
+
+class SearchIntentTestCase(unittest.TestCase):
+
+    def test_extract_search(self):
+        """Test cues, record kinds and name-only searches are recognized"""
+        search = nlp_processor.extract_search('search for projects about data analytics')
+        self.assertEqual((search['terms'], search['kind'], search['column']), (['data', 'analytics'], 'project', None))
+
+        search = nlp_processor.extract_search('employees named smith')
+        self.assertEqual((search['terms'], search['kind'], search['column']), (['smith'], 'employee', 'title'))
+
+        self.assertTrue(nlp_processor.extract_search('anything about "mobile billing"')['explicit'])
+        self.assertFalse(nlp_processor.extract_search('tell me about the average salary')['explicit'])
+
+        self.assertIsNone(nlp_processor.extract_search('show all employees'))
+        self.assertFalse(nlp_processor.extract_search('show salaries')['cue'])
+
+    def test_cue_does_not_override_confident_intent(self):
+        """Test a topic cue inside an aggregate or filtered query keeps the classified intent"""
+        self.assertEqual(nlp_processor.text_to_sql('Tell me about the average salary'),
+                         'SELECT AVG(salary) as average_salary FROM employees')
+        self.assertNotIn('MATCH', nlp_processor.text_to_sql('Show employees in IT regarding salary greater than 70000'))
+        self.assertIn('MATCH', nlp_processor.text_to_sql('anything about "mobile billing"'))
+
+    def test_search_api(self):
+        """Test search questions return ranked, highlighted matches"""
+        app = create_app()
+        app.config['TESTING'] = True
+        client = app.test_client()
+
+        data = json.loads(client.post('/api/query', data=json.dumps({'query': 'find projects about analytics'}),
+                                      content_type='application/json').data)
+        self.assertIn('MATCH', data['sql_query'])
+        self.assertEqual(data['results'][0]['title'], 'Data Analytics Platform')
+        self.assertIn('<mark>Analytics</mark>', data['results'][0]['snippet'])
+
+        data = json.loads(client.post('/api/query', data=json.dumps({'query': 'employees named smith'}),
+                                      content_type='application/json').data)
+        self.assertEqual([row['title'] for row in data['results']], ['Jane Smith'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+import unittest
+import json
+from unittest import mock
+from app import create_app
+import random
+from app.suggest import SuggestionIndex, SchemaSuggestions, HistorySuggestions
+
+class SuggestionIndexTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.index = SuggestionIndex()
+        self.index.add('Show all employees', 'example')
+        self.index.add('Show all projects', 'pattern')
+        self.index.add('average salary', 'pattern')
+
+    def texts(self, prefix):
+        return [suggestion['text'] for suggestion in self.index.suggest(prefix)]
+
+    def test_ranked_by_popularity(self):
+        """Test more popular phrases come first"""
+        self.assertEqual(self.texts('show all'), ['Show all employees', 'Show all projects'])
+
+        for _ in range(5):
+            self.index.bump('show all projects')
+        self.assertEqual(self.texts('show all'), ['Show all projects', 'Show all employees'])
+
+    def test_matches_word_starts(self):
+        """Test prefixes also match from any word, after whole-phrase matches"""
+        self.index.add('salary report', 'pattern')
+        self.assertEqual(self.texts('salary'), ['salary report', 'average salary'])
+        self.assertEqual(self.texts('  PROJ '), ['Show all projects'])
+        self.assertEqual(self.texts(''), [])
+
+    def test_remove(self):
+        """Test removing a phrase's last source drops it from the index"""
+        self.index.add('Show all projects', 'schema')
+        self.index.remove('Show all projects', 'pattern')
+        self.assertIn('Show all projects', self.texts('show'))
+
+        self.index.remove('Show all projects', 'schema')
+        self.assertNotIn('Show all projects', self.texts('show'))
+        self.assertEqual(len(self.index), 2)
+
+    def test_ranks_every_match(self):
+        """Test the most popular match wins however many keys share the prefix"""
+        for i in range(1000):
+            self.index.add(f'Show report {i:04d}', 'history', popularity=1.0)
+        self.index.add('Show report 9999', 'history', popularity=100.0)
+
+        self.assertEqual(self.texts('show report')[0], 'Show report 9999')
+
+    def test_short_prefixes_match_full_ranking(self):
+        """Test kept top lists for short prefixes stay equal to a full scan through adds, bumps and removals"""
+        index = SuggestionIndex(top_k=5)
+        rng = random.Random(7)
+        words = ['show', 'sales', 'salary', 'staff', 'average', 'all', 'active']
+        phrases = [' '.join(rng.sample(words, 3)) + f' {i}' for i in range(200)]
+        for phrase in phrases:
+            index.add(phrase, 'history', popularity=float(rng.randint(0, 3)))
+
+        for prefix in ('s', 'sa', 'a', 'av'):
+            index.suggest(prefix, 5)
+
+        for _ in range(300):
+            phrase = rng.choice(phrases)
+            action = rng.random()
+            if action < 0.7:
+                index.bump(phrase, rng.randint(1, 3))
+            elif action < 0.85:
+                index.remove(phrase, 'history')
+            else:
+                index.add(phrase, 'history', popularity=float(rng.randint(0, 6)))
+
+            for prefix in ('s', 'sa', 'a', 'av'):
+                with index._lock:
+                    expected = index._scan(prefix, 5)
+                self.assertEqual([s['text'] for s in index.suggest(prefix, 5)], expected)
+
+class HistorySuggestionsTestCase(unittest.TestCase):
+
+    def test_reloads_on_its_own_interval(self):
+        """Test past queries are reloaded whether or not the schema changed"""
+        index = SuggestionIndex()
+        history = HistorySuggestions(index, refresh_interval=0)
+        engine = mock.MagicMock()
+        connection = engine.connect.return_value.__enter__.return_value
+
+        connection.execute.return_value.fetchall.return_value = [('show payroll', 3)]
+        self.assertTrue(history.refresh(engine))
+        connection.execute.return_value.fetchall.return_value = [('show payroll', 3), ('list contractors', 9)]
+        self.assertTrue(history.refresh(engine))
+
+        self.assertEqual(index.suggest('li')[0]['text'], 'list contractors')
+
+        throttled = HistorySuggestions(index, refresh_interval=60)
+        self.assertTrue(throttled.refresh(engine))
+        self.assertFalse(throttled.refresh(engine))
+
+class SchemaSuggestionsTestCase(unittest.TestCase):
+
+    def test_applies_only_changes(self):
+        """Test schema values are diffed into the index"""
+        index = SuggestionIndex()
+        schema = SchemaSuggestions(index)
+        session = mock.Mock()
+
+        session.execute.return_value.fetchone.return_value = ('IT\x1fHR', 'Apollo', 'active')
+        self.assertTrue(schema.refresh(session, force=True))
+        self.assertEqual(index.suggest('show employees in h')[0]['text'], 'Show employees in HR department')
+
+        self.assertFalse(schema.refresh(session, force=True))
+
+        session.execute.return_value.fetchone.return_value = ('IT', 'Apollo', 'active')
+        self.assertTrue(schema.refresh(session, force=True))
+        self.assertEqual(index.suggest('show employees in h'), [])
+
+class SuggestAPITestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+
+    def test_suggest_endpoint(self):
+        """Test suggestions include examples and live schema values"""
+        data = json.loads(self.client.get('/api/suggest?prefix=show%20employees%20in%20eng').data)
+        self.assertTrue(data['success'])
+        self.assertIn('Show employees in Engineering department', [s['text'] for s in data['suggestions']])
+
+        data = json.loads(self.client.get('/api/suggest?prefix=how%20many&limit=3').data)
+        self.assertLessEqual(len(data['suggestions']), 3)
+        self.assertIn('took_ms', data)
+
+if __name__ == '__main__':
+    unittest.main()
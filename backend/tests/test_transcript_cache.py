@@ -0,0 +1,62 @@
+import unittest
+import os
+import tempfile
+from unittest import mock
+from app.transcript_cache import TranscriptCache
+
+class TranscriptCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.recognized = {'success': True, 'text': 'show all projects', 'error': None}
+        self.recognize = mock.Mock(return_value=self.recognized)
+
+    def test_repeated_clip_hits_cache(self):
+        """Test identical samples are only recognized once"""
+        cache = TranscriptCache(max_entries=4)
+
+        first = cache.recognize(b'\x01\x02' * 100, 16000, self.recognize)
+        second = cache.recognize(b'\x01\x02' * 100, 16000, self.recognize)
+
+        self.assertFalse(first['cached'])
+        self.assertTrue(second['cached'])
+        self.assertEqual(second['text'], 'show all projects')
+        self.assertEqual(self.recognize.call_count, 1)
+        self.assertEqual(cache.stats()['hit_rate'], 0.5)
+
+    def test_failures_are_not_cached(self):
+        """Test failed recognitions are retried"""
+        cache = TranscriptCache()
+        failing = mock.Mock(return_value={'success': False, 'text': None, 'error': 'Could not understand the audio'})
+
+        cache.recognize(b'\x00' * 10, 16000, failing)
+        cache.recognize(b'\x00' * 10, 16000, failing)
+        self.assertEqual(failing.call_count, 2)
+
+    def test_memory_tier_is_bounded(self):
+        """Test least recently used entries are evicted"""
+        cache = TranscriptCache(max_entries=2)
+        for i in range(3):
+            cache.recognize(bytes([i]) * 10, 16000, self.recognize)
+
+        self.assertEqual(cache.stats()['entries'], 2)
+        self.assertIsNone(cache.get(cache.key(bytes([0]) * 10, 16000)))
+
+    def test_disk_tier_survives_restart_until_ttl(self):
+        """Test the SQLite tier serves entries to a new cache instance"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            db_path = os.path.join(tmpdir, 'transcripts.db')
+            cache = TranscriptCache(db_path=db_path)
+            cache.recognize(b'\x05' * 10, 16000, self.recognize)
+            cache.close()
+
+            warm = TranscriptCache(db_path=db_path)
+            self.assertTrue(warm.recognize(b'\x05' * 10, 16000, self.recognize)['cached'])
+            self.assertEqual(warm.stats()['disk_hits'], 1)
+            warm.close()
+
+            expired = TranscriptCache(db_path=db_path, ttl=-1)
+            self.assertFalse(expired.recognize(b'\x05' * 10, 16000, self.recognize)['cached'])
+            expired.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,13 +1,46 @@
-import React, { useState } from 'react';
-import { Form, Button, InputGroup } from 'react-bootstrap';
+import React, { useState, useEffect } from 'react';
+import { Form, Button, InputGroup, ListGroup } from 'react-bootstrap';
 import { FiSearch } from 'react-icons/fi';
+import apiService from '../services/api';
 
 const QueryInput = ({ onSubmit, loading, disabled }) => {
   const [query, setQuery] = useState('');
+  const [suggestions, setSuggestions] = useState([]);
+
+  // Fetch completions as the user types; stale responses are ignored
+  useEffect(() => {
+    let cancelled = false;
+    const prefix = query.trim();
+
+    if (!prefix) {
+      setSuggestions([]);
+      return undefined;
+    }
+
+    apiService.getSuggestions(prefix)
+      .then((data) => {
+        if (!cancelled && data.success) {
+          setSuggestions(data.suggestions.filter((s) => s.text.toLowerCase() !== prefix.toLowerCase()));
+        }
+      })
+      .catch(() => {
+        if (!cancelled) setSuggestions([]);
+      });
+
+    return () => {
+      cancelled = true;
+    };
+  }, [query]);
+
+  const handleSuggestionClick = (text) => {
+    setQuery(text);
+    setSuggestions([]);
+  };
 
   const handleSubmit = (e) => {
     e.preventDefault();
     if (query.trim() && !loading && !disabled) {
+      setSuggestions([]);
       onSubmit(query.trim());
     }
   };
@@ -50,6 +83,19 @@ const QueryInput = ({ onSubmit, loading, disabled }) => {
           )}
         </Button>
       </InputGroup>
+      {suggestions.length > 0 && !disabled && (
+        <ListGroup className="mt-1">
+          {suggestions.slice(0, 5).map((suggestion) => (
+            <ListGroup.Item
+              key={suggestion.text}
+              action
+              onClick={() => handleSuggestionClick(suggestion.text)}
+            >
+              {suggestion.text}
+            </ListGroup.Item>
+          ))}
+        </ListGroup>
+      )}
       <Form.Text className="text-muted">
         Press Enter to submit, or Shift+Enter for a new line
       </Form.Text>
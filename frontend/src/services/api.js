@@ -91,6 +91,16 @@ export const apiService = {
     }
   },
 
+  // Get autocomplete suggestions for a partially typed query
+  getSuggestions: async (prefix) => {
+    try {
+      const response = await api.get('/api/suggest', { params: { prefix } });
+      return response.data;
+    } catch (error) {
+      throw error;
+    }
+  },
+
   // Get example queries
   getExamples: async () => {
     try {